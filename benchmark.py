@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Scaling benchmark for macro count and fallback depth.
+
+    $ fontforge -lang=py benchmark.py --sizes 10 100 1000 5000 --depths 1 2 4
+
+Every build uses a synthetic macro table and runs in its own process so that the peak memory is per build.
+Build time, peak RSS, output file size and the number of GSUB lookups are reported as JSON.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BASE_FONT = "DroidSansMono.ttf"
+
+# Fallback fonts in the order they are appended to the chain
+FALLBACK_FONTS = [
+    ("FiraCode", "FiraCode-Regular.ttf"),
+    ("LatinModern", "LatinModernMath.otf"),
+    ("DejaVu_Bold", "DejaVuSansMono-Bold.ttf"),
+    ("DejaVu_Italic", "DejaVuSansMono-Italic.ttf")
+]
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def macro_names(count: int) -> List[str]:
+    """
+    `count` distinct macro names. The names are the base 26 digits of their index (plus a fixed start),
+    so like real macro tables many names share prefixes.
+    """
+    names = []
+    for i in range(count):
+        name = ""
+        n = i
+        while True:
+            name = ALPHABET[n % 26] + name
+            n //= 26
+            if n == 0:
+                break
+        names.append("m" + name)
+    return names
+
+
+def _run_build(kind: str, size: int, depth: int, in_folder: str, out_folder: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """ Build one synthetic font. Runs inside a worker process. """
+    from ligaturize import EditFont, codepoint_index, peak_rss_kb
+
+    start = time.perf_counter()
+    font = EditFont(
+        BASE_FONT,
+        other_fonts=dict(FALLBACK_FONTS[:depth]),
+        in_folder=in_folder,
+        out_folder=out_folder,
+        **options
+    )
+
+    # Replacements that are only found at the end of the fallback chain
+    earlier = set(codepoint_index(font.font))
+    for font_name, _ in FALLBACK_FONTS[:depth - 1]:
+        earlier.update(font.backend.codepoint_index(font_name))
+    last_font = FALLBACK_FONTS[depth - 1][0]
+    replacements = [chr(c) for c in sorted(font.backend.codepoint_index(last_font))
+                    if c not in earlier and c > 0x7f and not 0xd800 <= c < 0xe000]
+    if len(replacements) == 0:
+        raise Exception(f"`{last_font}` has no glyphs that are missing in `{BASE_FONT}`")
+
+    names = macro_names(size)
+    if kind == "macros":
+        font.add_macros({name: replacements[i % len(replacements)] for i, name in enumerate(names)},
+                        repl_prefix="\\")
+    else:
+        for i, name in enumerate(names):
+            font.add_macro_font(name, {c: replacements[(i + j) % len(replacements)]
+                                       for j, c in enumerate("ABCDEF")}, repl_prefix="\\")
+
+    camel_name = f"Bench{kind.capitalize()}{size}D{depth}"
+    font.save(camel_name)
+    lookups = font.backend.lookup_count()
+    build_time = time.perf_counter() - start
+
+    output = Path(out_folder) / f"{camel_name}.ttf"
+    output_size = output.stat().st_size
+    output.unlink()
+    return {
+        "kind": kind,
+        "macros": size,
+        "fallback_depth": depth,
+        "build_seconds": build_time,
+        "peak_rss_kb": peak_rss_kb(),
+        "output_bytes": output_size,
+        "gsub_lookups": lookups
+    }
+
+
+def run_benchmark(
+    sizes: List[int],
+    depths: List[int], *,
+    kind: str = "macros",
+    in_folder: str = "input_files",
+    options: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build a font for each combination of `sizes` and `depths`, one fresh process per build.
+    The fonts are written to a temporary folder that is removed afterwards.
+    """
+    options = {} if options is None else options
+    for depth in depths:
+        if not 1 <= depth <= len(FALLBACK_FONTS):
+            raise Exception(f"Fallback depth must be between 1 and {len(FALLBACK_FONTS)}")
+    out_folder = tempfile.mkdtemp(prefix="benchmark-")
+    results = []
+    try:
+        for depth in depths:
+            for size in sizes:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(_run_build, kind, size, depth,
+                                             in_folder, out_folder, options).result()
+                print(f"{kind} {size:>6} depth {depth}: {result['build_seconds']:8.2f}s "
+                      f"{result['peak_rss_kb'] / 1024:8.1f} MB  {result['output_bytes']:>9} bytes  {result['gsub_lookups']:>6} lookups",
+                      file=sys.stderr)
+                results.append(result)
+    finally:
+        shutil.rmtree(out_folder, ignore_errors=True)
+    return results
+
+
+def scaling_exponents(results: List[Dict[str, Any]], key: str = "build_seconds") -> List[Dict[str, Any]]:
+    """
+    Empirical exponent `k` of `key ~ macros^k` between consecutive sizes of the same fallback depth.
+    Values clearly above 1 indicate superlinear scaling.
+    """
+    exponents = []
+    for depth in sorted(set(r["fallback_depth"] for r in results)):
+        runs = sorted((r for r in results if r["fallback_depth"] == depth), key=lambda r: r["macros"])
+        for small, large in zip(runs, runs[1:]):
+            if small[key] <= 0 or large["macros"] == small["macros"]:
+                continue
+            exponents.append({
+                "fallback_depth": depth,
+                "from": small["macros"],
+                "to": large["macros"],
+                "exponent": math.log(large[key] / small[key]) / math.log(large["macros"] / small["macros"])
+            })
+    return exponents
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Benchmark how font builds scale with the number of macros.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 4],
+                        help="Number of fallback fonts in the chain")
+    parser.add_argument("--kind", choices=["macros", "macro_font"], default="macros",
+                        help="Benchmark `add_macros` or `add_macro_font` (argument macros with 6 letters each)")
+    parser.add_argument("--share-lookups", action="store_true")
+    parser.add_argument("--deferred", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--max-exponent", type=float,
+                        help="Exit with an error if the build time grows faster than macros^MAX_EXPONENT")
+    args = parser.parse_args(argv)
+
+    options = {"share_lookups": args.share_lookups, "deferred": args.deferred}
+    results = run_benchmark(args.sizes, args.depths, kind=args.kind, options=options)
+    exponents = scaling_exponents(results)
+    report = {"options": options, "results": results, "scaling": exponents}
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.max_exponent is not None:
+        worst = max((e["exponent"] for e in exponents), default=0.0)
+        if worst > args.max_exponent:
+            print(f"Superlinear scaling: exponent {worst:.2f} > {args.max_exponent}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+"""
+Build a font from a declarative spec (JSON or TOML) instead of a script like `ligatures.py`.
+
+    $ fontforge -lang=py build.py ligatures.json
+
+The spec is hashed together with the input fonts. If nothing changed since the last build the
+font in the output folder is reused and FontForge is not run again.
+
+The same spec can be applied to several base fonts in parallel:
+
+    $ fontforge -lang=py build.py ligatures.json --fonts DroidSansMono.ttf DejaVuSansMono-Bold.ttf --jobs 4
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+from pathlib import Path
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Methods of `EditFont` that can be used as steps in a spec
+SPEC_METHODS = ("add_ligature", "add_ligatures", "add_macro",
+                "add_macros", "add_macro_font", "add_scripts", "set_glyph_width", "release_source_fonts")
+
+# Options of the spec that are passed to the `EditFont` constructor
+SPEC_OPTIONS = ("share_lookups", "deferred", "backend", "glyph_cache", "macro_counts", "min_macro_count")
+
+CACHE_FILE = ".build_cache.json"
+
+
+def load_spec(spec_file: str) -> Dict[str, Any]:
+    """ Load a spec from a `.json` or `.toml` file. """
+    path = Path(spec_file)
+    if path.suffix == ".toml":
+        if tomllib is None:
+            raise Exception("TOML specs require Python 3.11 or newer")
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+
+    for key in ("font", "save"):
+        if key not in spec:
+            raise Exception(f"Spec `{spec_file}` has no `{key}` entry")
+    for step in spec.get("steps", []):
+        if len(step) != 1 or next(iter(step)) not in SPEC_METHODS:
+            raise Exception(
+                f"Invalid step {step}. Each step is `{{ METHOD: ARGUMENTS }}` with METHOD one of {SPEC_METHODS}")
+    for option in spec.get("options", {}):
+        if option not in SPEC_OPTIONS:
+            raise Exception(f"Unknown option `{option}`")
+    return spec
+
+
+def draft_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """ The spec of a fast draft build of `spec` (see `EditFont.save(..., draft=True)`). It has another hash than the release build. """
+    return dict(spec, save=dict(spec["save"], draft=True))
+
+
+def output_file_name(spec: Dict[str, Any]) -> str:
+    """ The (first) file the spec is saved to (see `EditFont.save`). """
+    save = spec["save"]
+    file_name = save.get("file_name") or f"{save['camel_name']}.ttf"
+    if save.get("formats"):
+        file_name = Path(file_name).with_suffix("." + save["formats"][0]).as_posix()
+    return file_name
+
+
+def _hash_file(hash, path: Path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hash.update(chunk)
+
+
+def spec_hash(spec: Dict[str, Any], in_folder: str = "input_files") -> str:
+    """
+    Content hash of a build: the spec, the bytes of every input font and the source of the build scripts.
+    """
+    hash = hashlib.sha256()
+    hash.update(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for font_file in [spec["font"]] + list(spec.get("other_fonts", {}).values()):
+        hash.update(font_file.encode("utf-8"))
+        _hash_file(hash, Path(in_folder) / font_file)
+    macro_counts = spec.get("options", {}).get("macro_counts")
+    if macro_counts is not None:
+        _hash_file(hash, Path(macro_counts))
+    for script in ("ligaturize.py", "fonttools_backend.py", "corpus.py", "sizes.py", "build.py"):
+        _hash_file(hash, Path(__file__).parent / script)
+    return hash.hexdigest()
+
+
+def _spec_arguments(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """ Convert JSON values into the argument types of `EditFont`: lists of per part values become tuples. """
+    converted = dict(arguments)
+    fonts = converted.get("fonts")
+    if isinstance(fonts, list) and not all(isinstance(f, str) for f in fonts):
+        converted["fonts"] = tuple(fonts)
+    if isinstance(converted.get("repl_format"), list):
+        converted["repl_format"] = tuple(converted["repl_format"])
+    return converted
+
+
+def apply_spec(font, spec: Dict[str, Any], methods: Tuple[str, ...] = SPEC_METHODS):
+    """ Run all steps of `spec` on the `EditFont` `font`. Only steps of the given `methods` are run. """
+    for step in spec.get("steps", []):
+        method, arguments = next(iter(step.items()))
+        if method not in methods:
+            continue
+        arguments = _spec_arguments(arguments)
+        if method == "set_glyph_width":
+            width = arguments.pop("width")
+            font.glyph(**arguments).width = width
+        else:
+            getattr(font, method)(**arguments)
+
+
+def _read_cache(out_folder: str) -> Dict[str, str]:
+    cache_path = Path(out_folder) / CACHE_FILE
+    if not cache_path.exists():
+        return {}
+    with open(cache_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _update_cache(out_folder: str, entries: Dict[str, str]):
+    """ Record the build hashes `{ OUTPUT_FILE_NAME: HASH }`. """
+    if len(entries) == 0:
+        return
+    cache = _read_cache(out_folder)
+    cache.update(entries)
+    with open(Path(out_folder) / CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=4, sort_keys=True)
+
+
+def features_imports_file(fea_file: str) -> str:
+    """ The glyph import list written next to the feature file `fea_file` (see `EditFont.export_features`). """
+    return Path(fea_file).with_suffix(".imports.json").as_posix()
+
+
+def _up_to_date(spec: Dict[str, Any], in_folder: str, out_folder: str) -> Tuple[Path, str, bool]:
+    """ The output path and the hash of the build of `spec`, and whether the output was already built with this hash. """
+    output = Path(out_folder) / output_file_name(spec)
+    build_hash = spec_hash(spec, in_folder)
+    return output, build_hash, output.exists() and _read_cache(out_folder).get(output.name) == build_hash
+
+
+def _build(
+    spec: Dict[str, Any],
+    in_folder: str,
+    out_folder: str,
+    force: bool,
+    profile_file: Optional[str] = None,
+    fea_file: Optional[str] = None,
+    rule_set: Optional[Dict[str, Any]] = None,
+    keep_rules: bool = False
+) -> Tuple[Path, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Build `spec` unless it is up to date. With the `rule_set` of another font of the family only the glyphs are imported
+    (see `EditFont.apply_rule_set`), unless the rules do not fit this font.
+
+    Returns the output path, the hash of the build (`None` if nothing was built) and with `keep_rules` the rule set of the build.
+    With `profile_file` or `fea_file` the font is always built, they are written during the build.
+    """
+    output, build_hash, up_to_date = _up_to_date(spec, in_folder, out_folder)
+    if not force and up_to_date and profile_file is None and fea_file is None:
+        print(f"Up to date: {output.as_posix()}")
+        return output, None, None
+
+    # FontForge is only needed when there is something to build
+    from ligaturize import EditFont
+
+    font = EditFont(
+        spec["font"],
+        other_fonts=spec.get("other_fonts", {}),
+        in_folder=in_folder,
+        out_folder=out_folder,
+        profile=profile_file is not None,
+        **spec.get("options", {})
+    )
+    problems = [] if rule_set is None else font.check_rule_set(rule_set)
+    if rule_set is not None and len(problems) == 0:
+        font.apply_rule_set(rule_set)
+        apply_spec(font, spec, methods=("set_glyph_width",))
+    else:
+        if len(problems) > 0:
+            print(f"Building {spec['font']} from the spec, the rules do not fit: {'; '.join(problems[:5])}")
+        apply_spec(font, spec)
+    font.save(**spec["save"])
+    rules = font.rule_set() if keep_rules else None
+    if fea_file is not None:
+        font.export_features(fea_file, imports_file=features_imports_file(fea_file))
+    if profile_file is not None:
+        font.write_profile(profile_file)
+    # Batch workers build several fonts, nothing may stay open
+    font.close()
+    return output, build_hash, rules
+
+
+def build(spec_file: str, *, in_folder: str = "input_files", out_folder: str = "output_files", force: bool = False, profile_file: Optional[str] = None, fea_file: Optional[str] = None, draft: bool = False) -> Path:
+    """
+    Build the font described by `spec_file` into `out_folder`. The build is skipped if the output
+    is already there and was built from the same spec and input fonts (unless `force`, `profile_file` or `fea_file` is set).
+    With `profile_file` the timings and counters of the build are written there as JSON (see `EditFont.profile_report`).
+    With `fea_file` all lookups are written there as feature file and the glyph imports next to it (see `features_imports_file`).
+    With `draft` only the first output file is written, without hints (see `draft_spec`).
+    """
+    spec = load_spec(spec_file)
+    output, build_hash, _ = _build(draft_spec(spec) if draft else spec, in_folder, out_folder, force, profile_file, fea_file)
+    if build_hash is not None:
+        _update_cache(out_folder, {output.name: build_hash})
+    return output
+
+
+def plan(spec_file: str, *, in_folder: str = "input_files") -> Dict[str, Any]:
+    """
+    Resolve all steps of `spec_file` without building the font (see `EditFont.plan()`). Needs fontTools, not FontForge.
+    """
+    from ligaturize import EditFont
+
+    spec = load_spec(spec_file)
+    font = EditFont(
+        spec["font"],
+        other_fonts=spec.get("other_fonts", {}),
+        in_folder=in_folder,
+        **dict(spec.get("options", {}), backend="plan")
+    )
+    apply_spec(font, spec)
+    report = font.plan()
+    font.close()
+    return report
+
+
+class BuildResult(NamedTuple):
+    """ Result of building one base font in `build_batch(...)`. """
+    font: str
+    output: Optional[str]
+    ok: bool
+    error: Optional[str]
+    seconds: float
+    build_hash: Optional[str]
+
+
+def spec_for_font(spec: Dict[str, Any], font: str) -> Dict[str, Any]:
+    """
+    The spec applied to another base `font`. The font is named after the file name of `font`
+    (`RobotoMono-Regular.ttf` -> `RobotoMonoRegular`).
+    """
+    font_spec = dict(spec)
+    font_spec["font"] = font
+    font_spec["save"] = dict(spec["save"])
+    font_spec["save"]["camel_name"] = ''.join(
+        c for c in Path(font).stem if c.isalnum())
+    font_spec["save"].pop("file_name", None)
+    return font_spec
+
+
+def _build_worker(spec: Dict[str, Any], in_folder: str, out_folder: str, force: bool, rule_set: Optional[Dict[str, Any]] = None, keep_rules: bool = False) -> Tuple[BuildResult, Optional[Dict[str, Any]]]:
+    start = time.perf_counter()
+    try:
+        output, build_hash, rules = _build(spec, in_folder, out_folder, force, rule_set=rule_set, keep_rules=keep_rules)
+    except Exception:
+        return BuildResult(spec["font"], None, False, traceback.format_exc(), time.perf_counter() - start, None), None
+    return BuildResult(spec["font"], output.as_posix(), True, None, time.perf_counter() - start, build_hash), rules
+
+
+def build_batch(
+    spec_file: str,
+    fonts: List[str], *,
+    jobs: Optional[int] = None,
+    in_folder: str = "input_files",
+    out_folder: str = "output_files",
+    force: bool = False,
+    draft: bool = False
+) -> List[BuildResult]:
+    """
+    Apply the spec to each of the base `fonts` (file names inside `in_folder`) in parallel.
+
+    FontForge is not thread safe, so every font is built in its own worker process.
+    `jobs` is the number of worker processes (defaults to the number of CPUs).
+    Returns one `BuildResult` per font in the order of `fonts`. A failing font does not stop the other builds.
+    With `draft` every font is a draft build (see `draft_spec`).
+    """
+    spec = load_spec(spec_file)
+    if draft:
+        spec = draft_spec(spec)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_build_worker, spec_for_font(spec, font), in_folder, out_folder, force)
+                   for font in fonts]
+        results = [future.result()[0] for future in futures]
+
+    # Only the main process writes the cache
+    _update_cache(out_folder, {Path(result.output).name: result.build_hash
+                               for result in results
+                               if result.ok and result.output is not None and result.build_hash is not None})
+    return results
+
+
+def build_family(
+    spec_file: str,
+    fonts: List[str], *,
+    jobs: Optional[int] = None,
+    in_folder: str = "input_files",
+    out_folder: str = "output_files",
+    force: bool = False,
+    draft: bool = False
+) -> List[BuildResult]:
+    """
+    Apply the spec to the base `fonts` of one family, e.g. its regular, bold and italic font.
+
+    The first font is built from the spec. Its compiled rules (see `EditFont.rule_set`) are then applied to the
+    other fonts in parallel, which only import their glyphs. A font whose glyphs do not match the first one is
+    built from the spec. Returns one `BuildResult` per font in the order of `fonts`.
+    """
+    spec = load_spec(spec_file)
+    if draft:
+        spec = draft_spec(spec)
+    specs = [spec_for_font(spec, font) for font in fonts]
+    # The rules are needed as soon as one of the other fonts is built
+    stale = force or not all(_up_to_date(font_spec, in_folder, out_folder)[2] for font_spec in specs[1:])
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        first, rule_set = executor.submit(_build_worker, specs[0], in_folder, out_folder,
+                                          force or stale, keep_rules=stale).result()
+        futures = [executor.submit(_build_worker, font_spec, in_folder, out_folder, force, rule_set)
+                   for font_spec in specs[1:]]
+        results = [first] + [future.result()[0] for future in futures]
+
+    _update_cache(out_folder, {Path(result.output).name: result.build_hash
+                               for result in results
+                               if result.ok and result.output is not None and result.build_hash is not None})
+    return results
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Build a ligaturized font from a spec file.")
+    parser.add_argument("spec", help="Spec file (.json or .toml)")
+    parser.add_argument("--in-folder", default="input_files")
+    parser.add_argument("--out-folder", default="output_files")
+    parser.add_argument("--force", action="store_true",
+                        help="Build even if the output is up to date (implied by --profile and --features)")
+    parser.add_argument("--fonts", nargs="+",
+                        help="Apply the spec to each of these base fonts instead of the font in the spec")
+    parser.add_argument("--family", action="store_true",
+                        help="With --fonts: build the first font from the spec and apply its compiled rules to the other fonts")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of parallel builds with --fonts (default: number of CPUs)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Write build timings and counters as JSON to FILE")
+    parser.add_argument("--features", metavar="FEA_FILE",
+                        help="Write all lookups as OpenType feature file to FEA_FILE and the glyph imports next to it (.imports.json)")
+    parser.add_argument("--draft", action="store_true",
+                        help="Fast build for iteration: only the first output file, without hints. Not for releases")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only resolve the spec and print the glyphs and lookups it needs as JSON, fails on missing glyphs")
+    args = parser.parse_args(argv)
+
+    if args.plan:
+        if args.fonts is not None:
+            parser.error("--plan can not be combined with --fonts")
+        report = plan(args.spec, in_folder=args.in_folder)
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+        for missing in report["missing"]:
+            print(f"Missing: {missing['error']}", file=sys.stderr)
+        for conflict in report["macro_conflicts"]:
+            print(f"Conflict: {conflict['macro']} ({conflict['conflict']})", file=sys.stderr)
+        if len(report["missing"]) > 0:
+            sys.exit(1)
+        return
+
+    if args.fonts is None:
+        build(args.spec, in_folder=args.in_folder, out_folder=args.out_folder,
+              force=args.force, profile_file=args.profile, fea_file=args.features, draft=args.draft)
+        return
+
+    if args.features is not None:
+        parser.error("--features can not be combined with --fonts")
+    build_fonts = build_family if args.family else build_batch
+    results = build_fonts(args.spec, args.fonts, jobs=args.jobs,
+                          in_folder=args.in_folder, out_folder=args.out_folder, force=args.force, draft=args.draft)
+    for result in results:
+        if result.ok:
+            print(f"OK      {result.font} -> {result.output} ({result.seconds:.1f}s)")
+        else:
+            print(f"FAILED  {result.font} ({result.seconds:.1f}s)\n{result.error}")
+    if not all(result.ok for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Count how often macros occur in a corpus of LaTeX files.
+
+    $ python corpus.py ~/papers --spec ligatures.json --output macro_counts.json
+
+Files are read line by line in parallel worker processes, so memory only grows with the number of
+distinct macros. The counts can be passed to `EditFont(macro_counts=...)` to leave out rare macros
+and to order the macro rules by frequency.
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ligaturize import argument_key
+
+# `\name`, optionally followed by a single letter argument as in `\mathbb N` or `\mathbb{N}`
+MACRO_PATTERN = re.compile(r"\\([A-Za-z]+)(?:[  ]([A-Za-z0-9])(?![A-Za-z0-9])|\{([A-Za-z0-9])\})?")
+
+
+def iter_files(folder: str, extensions: Tuple[str, ...] = (".tex",)) -> Iterator[str]:
+    """ All files below `folder` with one of the `extensions`, without listing the whole tree first. """
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.endswith(extensions):
+                yield os.path.join(root, file_name)
+
+
+def count_file(path: str) -> Tuple[Counter, int]:
+    """ Macro and argument counts of one file and its number of lines. """
+    counts: Counter = Counter()
+    lines = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            lines += 1
+            for match in MACRO_PATTERN.finditer(line):
+                macro, argument = match.group(1), match.group(2) or match.group(3)
+                counts[macro] += 1
+                if argument is not None:
+                    counts[argument_key(macro, argument)] += 1
+    return counts, lines
+
+
+def count_corpus(folder: str, *, jobs: Optional[int] = None, extensions: Tuple[str, ...] = (".tex",)) -> Dict[str, Any]:
+    """
+    Count the macros of all files below `folder` in `jobs` worker processes (defaults to the number of CPUs).
+    Only a bounded number of files is queued at a time.
+
+    Returns `{ "files": FILES, "lines": LINES, "counts": { MACRO: COUNT } }`.
+    """
+    total: Counter = Counter()
+    files = 0
+    lines = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        max_pending = 4 * (jobs or os.cpu_count() or 1)
+        pending = set()
+
+        def collect(done):
+            nonlocal files, lines
+            for future in done:
+                counts, file_lines = future.result()
+                total.update(counts)
+                files += 1
+                lines += file_lines
+
+        for path in iter_files(folder, extensions):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(count_file, path))
+        collect(pending)
+    return {"files": files, "lines": lines, "counts": dict(total.most_common())}
+
+
+def spec_macros(spec: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    The macros a build spec defines as `{ MACRO: [ARGUMENT, ...] }` (the arguments of `add_macro_font`, else empty).
+    """
+    macros: Dict[str, List[str]] = {}
+    for step in spec.get("steps", []):
+        method, arguments = next(iter(step.items()))
+        if method == "add_macro":
+            macros[arguments["macro"]] = []
+        elif method == "add_macros":
+            for macro in arguments["macros"]:
+                macros[arguments.get("macro_prefix", "") + macro + arguments.get("macro_suffix", "")] = []
+        elif method == "add_macro_font":
+            macros[arguments["macro"]] = list(arguments["map"])
+    return macros
+
+
+def defined_counts(result: Dict[str, Any], macros: Dict[str, List[str]]) -> Dict[str, Any]:
+    """ Restrict the counts of `count_corpus(...)` to the defined `macros` and list the ones that never occur. """
+    counts = result["counts"]
+    keys = []
+    for macro, arguments in macros.items():
+        keys.append(macro)
+        keys += [argument_key(macro, argument) for argument in arguments]
+    defined = {key: counts.get(key, 0) for key in keys}
+    return {
+        "files": result["files"],
+        "lines": result["lines"],
+        "counts": dict(sorted(defined.items(), key=lambda item: -item[1])),
+        "unused": [key for key, count in defined.items() if count == 0]
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Count the macros in a corpus of LaTeX files.")
+    parser.add_argument("folder", help="Folder that is searched recursively")
+    parser.add_argument("--spec", help="Only report the macros defined in this build spec (see build.py)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--extensions", nargs="+", default=[".tex"])
+    parser.add_argument("--output", help="Write the counts as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = count_corpus(args.folder, jobs=args.jobs, extensions=tuple(args.extensions))
+    if args.spec is not None:
+        from build import load_spec
+        result = defined_counts(result, spec_macros(load_spec(args.spec)))
+    print(f"{result['files']} files, {result['lines']} lines, {len(result['counts'])} macros", file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+    else:
+        print(json.dumps(result, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+"""
+Backend of `EditFont` that does not need FontForge:
+
+    font = EditFont("DroidSansMono.ttf", other_fonts=..., backend="fonttools")
+
+Glyphs are copied with fontTools pens and all rules are written as an OpenType feature file that
+feaLib compiles into the GSUB table in one step when the font is saved.
+
+With `backend="plan"` the definitions are only resolved (see `PlanBackend`): nothing is imported or compiled,
+and `EditFont.plan()` reports the glyphs, lookups, missing glyphs and conflicting macros.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString
+from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.recordingPen import DecomposingRecordingPen
+from fontTools.pens.transformPen import TransformPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.subset import Options, Subsetter
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables import otTables as _otTables
+
+from ligaturize import LETTERS, _EditorBackend, _SourceFonts, _profiled, replay_outline
+
+# `sfnt_names` string ids of the name ids
+NAME_IDS = {
+    0: "Copyright", 1: "Family", 2: "SubFamily", 3: "UniqueID", 4: "Fullname", 5: "Version",
+    6: "PostScriptName", 7: "Trademark", 8: "Manufacturer", 9: "Designer", 10: "Descriptor",
+    11: "Vendor URL", 12: "Designer URL", 13: "License", 14: "License URL",
+    16: "Preferred Family", 17: "Preferred Styles"
+}
+
+# The classes of `otTables` are created at runtime, type checkers do not know them
+otTables: Any = _otTables
+
+# Tables with per glyph data that can not be extended by new glyphs
+GLYPH_COUNT_TABLES = ("hdmx", "LTSH", "VDMX")
+
+# Maximal error in font units when cubic outlines are converted to TrueType
+MAX_CURVE_ERROR = 1.0
+
+
+class _GlyphView:
+    """ The attributes of a FontForge glyph that the backends use. """
+
+    def __init__(self, font: "TTFontView", name: str):
+        self.font = font
+        self.glyphname = name
+
+    @property
+    def unicode(self) -> int:
+        unicodes = self.font.unicodes.get(self.glyphname)
+        return -1 if unicodes is None else unicodes[0]
+
+    @property
+    def altuni(self) -> Optional[Tuple[Tuple[int, int, int], ...]]:
+        unicodes = self.font.unicodes.get(self.glyphname, [])
+        return tuple((u, -1, 0) for u in unicodes[1:]) or None
+
+    @property
+    def encoding(self) -> int:
+        return self.font.tt.getGlyphID(self.glyphname)
+
+    @property
+    def width(self) -> int:
+        return self.font.tt["hmtx"][self.glyphname][0]
+
+    @width.setter
+    def width(self, width: int):
+        hmtx = self.font.tt["hmtx"]
+        hmtx[self.glyphname] = (int(width), hmtx[self.glyphname][1])
+
+
+class TTFontView:
+    """
+    A fontTools `TTFont` with the part of the FontForge font interface that `EditFont` and the backends use:
+    glyph access by name, `em`, the font names and `generate(...)`.
+    """
+
+    def __init__(self, tt: TTFont):
+        self.tt = tt
+        self._unicodes: Optional[Dict[str, List[int]]] = None
+
+    @property
+    def em(self) -> int:
+        head: Any = self.tt["head"]
+        return head.unitsPerEm
+
+    @property
+    def unicodes(self) -> Dict[str, List[int]]:
+        """ `{ GLYPH_NAME: [CODEPOINT, ...] }` from the cmap, smallest codepoint first. """
+        if self._unicodes is None:
+            self._unicodes = {}
+            for codepoint, name in sorted((self.tt.getBestCmap() or {}).items()):
+                self._unicodes.setdefault(name, []).append(codepoint)
+        return self._unicodes
+
+    def __iter__(self):
+        return iter(list(self.tt.getGlyphOrder()))
+
+    def __contains__(self, name) -> bool:
+        return name in self.tt.getReverseGlyphMap()
+
+    def __getitem__(self, name: str) -> _GlyphView:
+        if name not in self:
+            raise KeyError(name)
+        return _GlyphView(self, name)
+
+    def add_glyph(self, name: str, glyph: Any, width: int):
+        """ Append the `glyf` glyph `glyph` as `name`. """
+        glyf = self.tt["glyf"]
+        self.tt.setGlyphOrder(self.tt.getGlyphOrder() + [name])
+        glyf[name] = glyph
+        glyph.recalcBounds(glyf)
+        self.tt["hmtx"][name] = (width, getattr(glyph, "xMin", 0))
+
+    # Names
+    def _get_name(self, name_id: int) -> str:
+        value = self.tt["name"].getDebugName(name_id)
+        return "" if value is None else value
+
+    def _set_name(self, name_id: int, value: str):
+        name = self.tt["name"]
+        records = [record for record in name.names if record.nameID == name_id]
+        if len(records) == 0:
+            name.setName(value, name_id, 3, 1, 0x409)
+        for record in records:
+            name.setName(value, name_id, record.platformID, record.platEncID, record.langID)
+
+    fontname = property(lambda self: self._get_name(6), lambda self, value: self._set_name(6, value))
+    fullname = property(lambda self: self._get_name(4), lambda self, value: self._set_name(4, value))
+    familyname = property(lambda self: self._get_name(1), lambda self, value: self._set_name(1, value))
+    copyright = property(lambda self: self._get_name(0), lambda self, value: self._set_name(0, value))
+
+    @property
+    def sfnt_names(self) -> Tuple[Tuple[str, str, str], ...]:
+        return tuple(("English (US)", NAME_IDS[name_id], self._get_name(name_id))
+                     for name_id in sorted(NAME_IDS) if self.tt["name"].getName(name_id, 3, 1, 0x409) is not None)
+
+    @sfnt_names.setter
+    def sfnt_names(self, rows: Tuple[Tuple[str, str, str], ...]):
+        ids = {string_id: name_id for name_id, string_id in NAME_IDS.items()}
+        for _, string_id, value in rows:
+            if value != self._get_name(ids[string_id]):
+                self._set_name(ids[string_id], value)
+
+    def generate(self, file_name: str, flags: Tuple[str, ...] = ()):
+        """
+        Write the font. The format is taken from the extension: `.ttf`, `.woff` or `.woff2`.
+        Of FontForge's `flags` only "omit-instructions" is supported, it removes all TrueType instructions from the font.
+        """
+        flavors = {".ttf": None, ".woff": "woff", ".woff2": "woff2"}
+        suffix = file_name[file_name.rfind("."):].lower()
+        if suffix not in flavors:
+            raise Exception(
+                f"The fontTools backend can only write {', '.join(flavors)} files, not `{file_name}`")
+        if "omit-instructions" in flags:
+            self.remove_instructions()
+        self.tt.flavor = flavors[suffix]
+        try:
+            self.tt.save(file_name)
+        finally:
+            self.tt.flavor = None
+
+    def remove_instructions(self):
+        """ Remove the TrueType instructions of all glyphs and the tables that only hinting uses. """
+        glyf = self.tt["glyf"]
+        for name in self.tt.getGlyphOrder():
+            glyf[name].removeHinting()
+        for tag in ("fpgm", "prep", "cvt ", "hdmx", "LTSH", "VDMX"):
+            if tag in self.tt:
+                del self.tt[tag]
+
+    def save(self, file_name: str):
+        raise Exception(f"The fontTools backend can not write FontForge projects (`{file_name}`)")
+
+    def close(self):
+        self.tt.close()
+
+
+def open_font(path: str) -> TTFontView:
+    """ Open the font file `path` for the fontTools backend. """
+    tt = TTFont(path, lazy=False)
+    tt.ensureDecompiled()
+    return TTFontView(tt)
+
+
+def _lookup_records(table: Any):
+    """ All `SubstLookupRecord`s inside a GSUB lookup, including extension subtables. """
+    if isinstance(table, list):
+        for item in table:
+            yield from _lookup_records(item)
+    elif hasattr(table, "LookupListIndex") and hasattr(table, "SequenceIndex"):
+        yield table
+    elif hasattr(table, "__dict__"):
+        for value in vars(table).values():
+            if isinstance(value, list) or hasattr(value, "__dict__"):
+                yield from _lookup_records(value)
+
+
+def merge_gsub(ours: Any, existing: Any):
+    """
+    Merge the lookups and features of the `existing` GSUB table of the base font into the GSUB table `ours`,
+    so our lookups run first as with FontForge.
+
+    Shapers only apply the first feature with a tag in a language system, so a feature that both tables have becomes
+    one feature with our lookups first. A script or language that only one table lists gets the default of the other.
+    """
+    if getattr(existing, "FeatureVariations", None) is not None:
+        raise Exception("Fonts with GSUB feature variations are not supported by the fontTools backend")
+    lookup_offset = len(ours.LookupList.Lookup)
+    for lookup in existing.LookupList.Lookup:
+        for record in _lookup_records(lookup.SubTable):
+            record.LookupListIndex += lookup_offset
+    ours.LookupList.Lookup += existing.LookupList.Lookup
+    ours.LookupList.LookupCount = len(ours.LookupList.Lookup)
+
+    our_features = ours.FeatureList.FeatureRecord
+    existing_features = existing.FeatureList.FeatureRecord
+    for record in existing_features:
+        record.Feature.LookupListIndex = [i + lookup_offset for i in record.Feature.LookupListIndex]
+
+    # Merged features `{ (TAG, OUR_INDEX, EXISTING_INDEX): FeatureRecord }`, the index of a table without it is `None`
+    merged: Dict[Tuple[str, Optional[int], Optional[int]], Any] = OrderedDict()
+    # `(LangSys, FEATURE_KEYS, REQUIRED_FEATURE_KEY)`, the feature indices are set once the features are sorted
+    lang_systems: List[Tuple[Any, List[Tuple[str, Optional[int], Optional[int]]], Any]] = []
+
+    def feature_key(tag: str, our_index: Optional[int], existing_index: Optional[int]):
+        key = (tag, our_index, existing_index)
+        if key not in merged:
+            sources = ([] if our_index is None else [our_features[our_index]]) + \
+                ([] if existing_index is None else [existing_features[existing_index]])
+            record = otTables.FeatureRecord()
+            record.FeatureTag = tag
+            record.Feature = otTables.Feature()
+            record.Feature.FeatureParams = sources[0].Feature.FeatureParams
+            record.Feature.LookupListIndex = [i for source in sources for i in source.Feature.LookupListIndex]
+            record.Feature.LookupCount = len(record.Feature.LookupListIndex)
+            merged[key] = record
+        return key
+
+    def merge_lang_sys(our_lang_sys, existing_lang_sys):
+        our_indices = [] if our_lang_sys is None else our_lang_sys.FeatureIndex
+        existing_indices = [] if existing_lang_sys is None else existing_lang_sys.FeatureIndex
+        existing_first: Dict[str, int] = {}
+        for i in existing_indices:
+            existing_first.setdefault(existing_features[i].FeatureTag, i)
+        keys = []
+        merged_tags = set()
+        for i in our_indices:
+            tag = our_features[i].FeatureTag
+            if tag in existing_first and tag not in merged_tags:
+                merged_tags.add(tag)
+                keys.append(feature_key(tag, i, existing_first[tag]))
+            else:
+                keys.append(feature_key(tag, i, None))
+        for i in existing_indices:
+            tag = existing_features[i].FeatureTag
+            if tag not in merged_tags or existing_first[tag] != i:
+                keys.append(feature_key(tag, None, i))
+
+        required = None
+        if our_lang_sys is not None and our_lang_sys.ReqFeatureIndex != 0xFFFF:
+            required = feature_key(our_features[our_lang_sys.ReqFeatureIndex].FeatureTag, our_lang_sys.ReqFeatureIndex, None)
+        elif existing_lang_sys is not None and existing_lang_sys.ReqFeatureIndex != 0xFFFF:
+            required = feature_key(existing_features[existing_lang_sys.ReqFeatureIndex].FeatureTag, None,
+                                   existing_lang_sys.ReqFeatureIndex)
+        lang_sys = otTables.LangSys()
+        lang_sys.LookupOrder = None
+        lang_systems.append((lang_sys, keys, required))
+        return lang_sys
+
+    def languages(script) -> Dict[str, Any]:
+        return {} if script is None else {record.LangSysTag: record.LangSys for record in script.LangSysRecord}
+
+    our_scripts = {record.ScriptTag: record.Script for record in ours.ScriptList.ScriptRecord}
+    existing_scripts = {record.ScriptTag: record.Script for record in existing.ScriptList.ScriptRecord}
+    script_records = []
+    for script_tag in sorted(set(our_scripts) | set(existing_scripts)):
+        # A shaper falls back to `DFLT` for a script that the font does not list
+        our_script = our_scripts.get(script_tag, our_scripts.get("DFLT"))
+        existing_script = existing_scripts.get(script_tag, existing_scripts.get("DFLT"))
+        our_default = None if our_script is None else our_script.DefaultLangSys
+        existing_default = None if existing_script is None else existing_script.DefaultLangSys
+        our_languages, existing_languages = languages(our_script), languages(existing_script)
+
+        script = otTables.Script()
+        script.DefaultLangSys = None
+        if our_default is not None or existing_default is not None:
+            script.DefaultLangSys = merge_lang_sys(our_default, existing_default)
+        script.LangSysRecord = []
+        for lang_tag in sorted(set(our_languages) | set(existing_languages)):
+            lang_record = otTables.LangSysRecord()
+            lang_record.LangSysTag = lang_tag
+            lang_record.LangSys = merge_lang_sys(our_languages.get(lang_tag, our_default),
+                                                 existing_languages.get(lang_tag, existing_default))
+            script.LangSysRecord.append(lang_record)
+        script.LangSysCount = len(script.LangSysRecord)
+        record = otTables.ScriptRecord()
+        record.ScriptTag = script_tag
+        record.Script = script
+        script_records.append(record)
+
+    # `sorted` is stable: features with the same tag keep the order in which they were merged
+    order = sorted(merged, key=lambda key: key[0])
+    indices = {key: i for i, key in enumerate(order)}
+    ours.FeatureList.FeatureRecord = [merged[key] for key in order]
+    ours.FeatureList.FeatureCount = len(order)
+    for lang_sys, keys, required in lang_systems:
+        lang_sys.FeatureIndex = [indices[key] for key in keys]
+        lang_sys.FeatureCount = len(lang_sys.FeatureIndex)
+        lang_sys.ReqFeatureIndex = 0xFFFF if required is None else indices[required]
+    ours.ScriptList.ScriptRecord = script_records
+    ours.ScriptList.ScriptCount = len(script_records)
+
+
+class FontToolsBackend(_EditorBackend):
+    """
+    `_EditorBackend` on top of fontTools. The lookups are only recorded in `self.features`
+    and compiled into the GSUB table by `compile()`.
+
+    The font is always built in deferred mode. The base font must have TrueType outlines,
+    cubic outlines of source fonts are converted.
+    """
+
+    def __init__(self, font: TTFontView, other_fonts: Union[_SourceFonts, Dict[str, Any]], *, share_lookups: bool = False, deferred: bool = True, profiler=None, glyph_cache=None):
+        if "glyf" not in font.tt:
+            raise Exception("The fontTools backend needs a base font with TrueType outlines")
+        super().__init__(font, other_fonts, share_lookups=share_lookups, deferred=True,
+                         profiler=profiler, glyph_cache=glyph_cache)
+        for tag in GLYPH_COUNT_TABLES:
+            if tag in font.tt:
+                del font.tt[tag]
+        # The lookups of the base font. Glyphs are only appended, so the glyph ids stay valid.
+        self._base_gsub = font.tt["GSUB"].compile(font.tt) if "GSUB" in font.tt else None
+        self._max_macro_len = -1
+
+    def _read_codepoint_index(self, font: TTFontView) -> Dict[int, str]:
+        return dict(font.tt.getBestCmap() or {})
+
+    def _glyph_drawable(self, font: TTFontView, glyph_name: str):
+        return font.tt.getGlyphSet()[glyph_name]
+
+    @classmethod
+    def _glyph_content_key(cls, font: TTFontView, glyph_name: str) -> Tuple[Any, ...]:
+        glyph_set = font.tt.getGlyphSet()
+        pen = DecomposingRecordingPen(glyph_set)
+        glyph_set[glyph_name].draw(pen)
+        return (font.em, font[glyph_name].width, tuple(pen.value))
+
+    def add_glyph_manually(self, glyph_name: str, source_glyph: str, font: TTFontView):
+        self.add_glyphs_manually([(glyph_name, source_glyph)], font)
+
+    @_profiled("import_glyphs")
+    def add_glyphs_manually(self, glyphs: List[Tuple[str, str]], font: TTFontView):
+        """ Copy the decomposed outlines of `(glyph_name, source_glyph)` scaled to the em size of the font. """
+        factor = self.font.em / font.em
+        for glyph_name, source_glyph in glyphs:
+            width, outline = self._read_outline(font, source_glyph)
+            self._add_outline_glyph(glyph_name, outline, round(width * factor), factor)
+
+    def _add_outline_glyph(self, glyph_name: str, outline: List[Any], width: int, factor: float):
+        pen = TTGlyphPen(None)
+        # Cubic curves only come from PostScript outlines, which run the other way round
+        cubic = any(operator == "curveTo" for operator, _ in outline)
+        out_pen = Cu2QuPen(pen, MAX_CURVE_ERROR, reverse_direction=True) if cubic else pen
+        replay_outline(outline, TransformPen(out_pen, (factor, 0, 0, factor, 0, 0)))
+        self.font.add_glyph(glyph_name, pen.glyph(), width)
+
+    ## LOOKUPS ##
+    def _context_lookup(self, ctx_lookup_name: str, lookup_feature, lookup_after):
+        if ctx_lookup_name in self.features.context_rules:
+            return
+        self.profiler.count("lookups")
+        self.features.add_context_lookup(ctx_lookup_name, lookup_feature, lookup_after)
+
+    def _add_glyph_subtable(self, ctx_lookup_name: str, ctx_lookup_sub_name: str, look_back: List[str], char_in: List[str], sub_lookups: List[str], look_ahead: List[str]):
+        self.features.add_context_rule(ctx_lookup_name, [(glyph,) for glyph in char_in], sub_lookups,
+                                       look_back=[(glyph,) for glyph in look_back], look_ahead=[(glyph,) for glyph in look_ahead])
+
+    def _add_class_subtable(self, ctx_lookup_name: str, ctx_lookup_sub_name: str, classes: List[Tuple[str, ...]], sub_lookups: List[str], look_back: List[Tuple[str, ...]] = []):
+        self.features.add_context_rule(ctx_lookup_name, classes, sub_lookups, look_back=look_back)
+
+    def _new_substitution_lookup(self, lookup_type: str, lookup_name: str, lookup_sub_name: str):
+        self.features.add_substitution_lookup(lookup_name, lookup_sub_name)
+
+    def _add_substitution(self, lookup_sub_name: str, glyph_in: Any, glyph_out: str):
+        self.features.add_substitution(lookup_sub_name, glyph_in, glyph_out)
+
+    @_profiled("lookups")
+    def add_marker_glyph(self, marker: str, reference: Optional[str] = None):
+        """ See `_EditorBackend.add_marker_glyph(...)`. """
+        reference = self.BACKSLASH if reference is None else reference
+        pen = TTGlyphPen(self.font.tt.getGlyphSet())
+        pen.addComponent(reference, (1, 0, 0, 1, 0, 0))
+        self.font.add_glyph(marker, pen.glyph(), self.font[reference].width)
+        self.marker_glyphs[marker] = reference
+        self.glyph_groups.setdefault(marker, self.group)
+
+    def apply_features(self, text: str):
+        """ See `_EditorBackend.apply_features(...)`. The feature file is compiled by `compile()`. """
+        self._applied_features = text
+
+    def lookup_macros(self, max_len: int):
+        """ See `_EditorBackend.lookup_macros(...)`. """
+        self._context_lookup(self.macro_length_lookup, self.feature, None)
+        if max_len <= self._max_macro_len:
+            return
+        self.flush_imports()
+
+        letters = tuple(self.useable_glyphs["Default"]["unicode"][c]
+                        for c in LETTERS if c in self.useable_glyphs["Default"]["unicode"])
+        for length in range(self._max_macro_len+2, max_len+2):
+            marker = self.macro_glyph_name(length)
+            if marker not in self.font:
+                self.add_marker_glyph(marker)
+
+            lookup_name = f"lookup.macro.length.{length}"
+            lookup_sub_name = f"lookup.sub.macro.length.{length}"
+            self._new_substitution_lookup("gsub_single", lookup_name, lookup_sub_name)
+            self._add_substitution(lookup_sub_name, self.BACKSLASH, marker)
+            self.features.add_context_rule(self.macro_length_lookup, [(self.BACKSLASH,)], [lookup_name],
+                                           look_ahead=[letters] * length)
+            self.profiler.count("lookups")
+            self.profiler.count("subtables", 2)
+        self._max_macro_len = max_len
+
+    @_profiled("lookups")
+    def compile(self):
+        """ Compile all recorded rules into the GSUB table of the font. The lookups of the base font run afterwards. """
+        super().compile()
+        if self._applied_features is None and len(self.features.context_order) == 0:
+            return
+        tt = self.font.tt
+        if "GSUB" in tt:
+            del tt["GSUB"]
+        addOpenTypeFeaturesFromString(tt, self.features_text(), tables=["GSUB"])
+        if self._base_gsub is not None:
+            base_gsub: Any = newTable("GSUB")
+            base_gsub.decompile(self._base_gsub, tt)
+            gsub: Any = tt["GSUB"]
+            merge_gsub(gsub.table, base_gsub.table)
+
+    def lookup_count(self) -> int:
+        """ See `_EditorBackend.lookup_count()`. """
+        if "GSUB" not in self.font.tt:
+            return 0
+        gsub: Any = self.font.tt["GSUB"]
+        return len(gsub.table.LookupList.Lookup) if gsub.table.LookupList is not None else 0
+
+    def prune_glyphs(self) -> List[str]:
+        """ See `_EditorBackend.prune_glyphs()`. The glyph closure is computed by the fontTools subsetter. """
+        tt = self.font.tt
+        before = tt.getGlyphOrder()
+        options = Options(
+            layout_features=["*"],
+            name_IDs=["*"],
+            name_languages=["*"],
+            name_legacy=True,
+            glyph_names=True,
+            notdef_outline=True,
+            legacy_kern=True,
+            hinting=True,
+            drop_tables=[],
+            passthrough_tables=True,
+            prune_unicode_ranges=False
+        )
+        subsetter = Subsetter(options)
+        # Kept like in the FontForge backend, the subsetter would drop them
+        kept_glyphs = [name for name in (".notdef", ".null", "nonmarkingreturn") if name in self.font]
+        subsetter.populate(glyphs=kept_glyphs, unicodes=(tt.getBestCmap() or {}).keys())
+        subsetter.subset(tt)
+        self.font._unicodes = None
+
+        kept = set(tt.getGlyphOrder())
+        removed = [name for name in before if name not in kept]
+        self.profiler.count("glyphs_pruned", len(removed))
+        return removed
+
+
+class PlanBackend(FontToolsBackend):
+    """
+    Backend of `EditFont(..., backend="plan")`: a dry run that resolves every glyph and records every lookup like
+    `FontToolsBackend`, but neither imports glyphs nor compiles the lookups. Any base font can be planned.
+    The outlines of the used source glyphs are still read, they decide which glyphs are the same (see `_source_content_key`).
+
+    Glyphs that can not be resolved do not stop the run, they are collected in `missing` (see `plan()`).
+    """
+
+    def __init__(self, font: TTFontView, other_fonts: Union[_SourceFonts, Dict[str, Any]], *, share_lookups: bool = False, deferred: bool = True, profiler=None, glyph_cache=None):
+        # Nothing is written to the font, so it needs no TrueType outlines and keeps all tables
+        _EditorBackend.__init__(self, font, other_fonts, share_lookups=share_lookups, deferred=True,
+                                profiler=profiler, glyph_cache=glyph_cache)
+        self._base_gsub = None
+        self._max_macro_len = -1
+        # Placeholder glyph names of unresolved glyphs `{ (GLYPH, FORMAT, FONTS): NAME }` and their errors
+        self._missing: Dict[Tuple[str, str, Optional[Tuple[str, ...]]], str] = OrderedDict()
+        self._missing_errors: List[str] = []
+        self._planned_macros: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = []
+
+    def use_glyph(self, glyph: str, *, fonts: Optional[List[str]] = None, format: Literal["unicode", "name"] = "unicode"):
+        """ See `_EditorBackend.use_glyph(...)`. A glyph that is not found gets a placeholder name. """
+        try:
+            return super().use_glyph(glyph, fonts=fonts, format=format)
+        except Exception as e:
+            key = (glyph, format, None if fonts is None else tuple(fonts))
+            if key not in self._missing:
+                self._missing[key] = f"missing.{len(self._missing)}"
+                self._missing_errors.append(str(e))
+            return self._missing[key]
+
+    def use_glyphs(self, glyphs: List[str], *, fonts: Optional[List[str]] = None) -> List[str]:
+        return [self.use_glyph(glyph, fonts=fonts) for glyph in glyphs]
+
+    def flush_imports(self):
+        """ Only record the pending imports in `imported_glyphs`, no source font is opened. """
+        pending, self._pending_imports = self._pending_imports, OrderedDict()
+        for font_name, glyphs in pending.items():
+            self.imported_glyphs += [(glyph_name, font_name, source_glyph) for glyph_name, source_glyph in glyphs]
+
+    def add_marker_glyph(self, marker: str, reference: Optional[str] = None):
+        self.marker_glyphs[marker] = self.BACKSLASH if reference is None else reference
+
+    def _add_macro_rule(self, macro_len: int, char_in: List[str], char_out: List[str], weight: int = 0):
+        self._planned_macros.append((tuple(char_in), tuple(char_out)))
+        super()._add_macro_rule(macro_len, char_in, char_out, weight)
+
+    @_profiled("lookups")
+    def compile(self):
+        """ Record the lookups of all definitions without compiling them. """
+        _EditorBackend.compile(self)
+
+    def _conflict_text(self, glyphs: Tuple[str, ...]) -> str:
+        """ `_glyph_text(...)` with a no-break space written as space, both separate an argument and give the same text. """
+        return self._glyph_text(glyphs).replace("\u00a0", " ")
+
+    def _glyph_text(self, glyphs: Tuple[str, ...]) -> str:
+        """ The characters of a glyph sequence as far as they are known, e.g. `\\alpha` for a macro input. """
+        names = {glyph_name: chr(c) for c, glyph_name in self._read_codepoint_index(self.font).items()}
+        for font_name, glyph_names in self.useable_glyphs.items():
+            names.update((glyph_name, c) for c, glyph_name in glyph_names["unicode"].items())
+        names.update((self.macro_glyph_name(length), "\\") for length in range(1, len(glyphs) + 1))
+        return "".join(names.get(glyph_name, f"[{glyph_name}]") for glyph_name in glyphs)
+
+    def macro_conflicts(self) -> List[Dict[str, str]]:
+        """
+        Macros whose input is defined twice with different replacements, and macros whose input is a prefix of another
+        macro with the same name (e.g. `\\mathbb` and `\\mathbb N`). Which of them applies depends on the order of the rules.
+        """
+        outputs: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        # The space and no-break space variants of a macro have the same text, so they are reported once
+        conflicts: Dict[Tuple[str, str], None] = OrderedDict()
+        for char_in, char_out in self._planned_macros:
+            if char_in in outputs and outputs[char_in] != char_out:
+                conflicts[(self._conflict_text(char_in), "redefined")] = None
+            outputs.setdefault(char_in, char_out)
+        for char_in in outputs:
+            for length in range(2, len(char_in)):
+                if char_in[:length] in outputs:
+                    conflicts[(self._conflict_text(char_in[:length]), f"prefix of {self._conflict_text(char_in)}")] = None
+        return [{"macro": macro, "conflict": conflict} for macro, conflict in conflicts]
+
+    def plan(self) -> Dict[str, Any]:
+        """
+        Report of all definitions so far:
+
+            {
+                "glyphs": [{ "name": NAME, "font": FONT_NAME, "source": SOURCE_GLYPH }],
+                "glyphs_by_font": { FONT_NAME: GLYPHS },
+                "markers": MARKERS, "lookups": LOOKUPS, "rules": RULES,
+                "missing": [{ "glyph": GLYPH, "format": FORMAT, "fonts": FONTS, "error": ERROR }],
+                "macro_conflicts": [{ "macro": MACRO, "conflict": CONFLICT }]
+            }
+        """
+        conflicts = self.macro_conflicts()
+        self.compile()
+        counts = self.features.rule_counts()
+        glyphs_by_font: Dict[str, int] = OrderedDict()
+        for _, font_name, _ in self.imported_glyphs:
+            glyphs_by_font[font_name] = glyphs_by_font.get(font_name, 0) + 1
+        return {
+            "glyphs": [{"name": name, "font": font_name, "source": source}
+                       for name, font_name, source in self.imported_glyphs],
+            "glyphs_by_font": glyphs_by_font,
+            "markers": len(self.marker_glyphs),
+            "lookups": len(counts),
+            "rules": sum(counts.values()),
+            "missing": [{"glyph": glyph, "format": format, "fonts": None if fonts is None else list(fonts), "error": error}
+                        for (glyph, format, fonts), error in zip(self._missing, self._missing_errors)],
+            "macro_conflicts": conflicts
+        }
@@ -1,40 +1,63 @@
 #!/usr/bin/env python
 from collections import OrderedDict
-import fontforge
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import functools
+import hashlib
+import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Union
 
+try:
+    import fontforge
+except ImportError:  # Only the fontTools backend can be used (see `fonttools_backend.py`)
+    fontforge = None
 
-def name_from_codepoint(font, unicode_str):
-    unicode = ord(unicode_str)
-    alt_match = None
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def argument_key(macro: str, argument: str) -> str:
+    """ Key of a macro with an argument in the counts, both `\\mathbb N` and `\\mathbb{N}` count as `mathbb{N}`. """
+    return f"{macro}{{{argument}}}"
+
+
+def codepoint_index(font) -> Dict[int, str]:
+    """ Map every codepoint of `font` to a glyph name. A primary unicode value always wins over an `altuni` entry. """
+    index: Dict[int, str] = {}
+    alt_index: Dict[int, str] = {}
     for glyph_name in font:
         glyph = font[glyph_name]
-        if glyph.unicode == unicode:
-            return glyph_name
+        if glyph.unicode != -1 and glyph.unicode not in index:
+            index[glyph.unicode] = glyph_name
         if (glyph.altuni is not None):
             for alt in glyph.altuni:
-                if (alt[0] == unicode):
-                    alt_match = glyph_name
-    return alt_match
+                alt_index[alt[0]] = glyph_name
+    for unicode, glyph_name in alt_index.items():
+        index.setdefault(unicode, glyph_name)
+    return index
 
 
-def find_unicode_glyph(font, unicode_char: str) -> Optional[str]:
-    """ Find a unicode glyph inside a font. The passed character should be a single character unicode string. """
+def name_from_codepoint(index: Dict[int, str], unicode_str: str) -> Optional[str]:
+    return find_unicode_glyph(index, unicode_str)
+
+
+def find_unicode_glyph(index: Dict[int, str], unicode_char: str) -> Optional[str]:
+    """
+    Find a unicode glyph in the `codepoint_index(font)` of a font. The passed character should be a single character unicode string.
+    Build the index once per font and pass it to every call, scanning the glyphs of the font for each character is slow.
+    """
     if len(unicode_char) != 1:
         raise Exception(f"`{unicode_char}` is not length 1")
-    unicode = ord(unicode_char)
-    alt_match = None
-    for glyph_name in font:
-        glyph = font[glyph_name]
-        if glyph.unicode == unicode:
-            return glyph_name
-        if (glyph.altuni is not None):
-            for alt in glyph.altuni:
-                if (alt[0] == unicode):
-                    alt_match = glyph_name
-    return alt_match
+    return index.get(ord(unicode_char))
 
 
 def split_camel_case(str):
@@ -65,13 +88,460 @@ def change_font_names(font, fontname, fullname, familyname, copyright_add, uniqu
 
 Glyph_Format = Literal["unicode", "advanced"]
 
+
+# `generate` flags of draft builds (see `EditFont.save(..., draft=True)`): no hints and no TrueType instructions
+DRAFT_FLAGS = ("no-hints", "omit-instructions", "no-FFTM-table")
+
+
+def generate_atomic(font, output: Path, flags: Tuple[str, ...] = ()):
+    """
+    Write `font` to `output` through a temporary file in the same folder that is renamed afterwards.
+    So `output` is either the old or the complete new file, also if several builds run at the same time.
+    The format is taken from the extension of `output` (`.sfd` saves a FontForge project).
+    `flags` are passed to FontForge's `generate`, e.g. `DRAFT_FLAGS`.
+    """
+    output = Path(output)
+    # A fresh folder instead of a file from `mkstemp` so that the file gets the usual permissions
+    temp_folder = tempfile.mkdtemp(dir=output.parent, prefix=f".{output.stem}.")
+    temp_name = os.path.join(temp_folder, output.name)
+    try:
+        if output.suffix == ".sfd":
+            font.save(temp_name)
+        elif len(flags) > 0:
+            font.generate(temp_name, flags=flags)
+        else:
+            font.generate(temp_name)
+        os.replace(temp_name, output)
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+def peak_rss_kb() -> Optional[int]:
+    """ Peak resident memory of this process in kilobytes, `None` where it is not available. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _generate_from_sfd(sfd_file: str, output: str):
+    """ Generate `output` from the saved font `sfd_file`. Runs inside a worker process of `EditFont.save`. """
+    if fontforge is None:
+        raise Exception("The FontForge python module is not available")
+    font = fontforge.open(sfd_file)
+    try:
+        generate_atomic(font, Path(output))
+    finally:
+        font.close()
+
+
+class _Profiler:
+    """
+    Opt-in build instrumentation. Records the exclusive wall time of build phases, the time spent in each
+    definition group (e.g. one `add_macros` call) and structural counters. Does nothing unless `enabled`.
+
+    Each phase also records the peak memory of the process when it ends (`peak_rss_kb`) and by how much
+    the peak grew while it ran (`peak_rss_growth_kb`), so the phase that determines the peak can be found.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases: Dict[str, Dict[str, float]] = OrderedDict()
+        self.groups: Dict[str, Dict[str, Any]] = OrderedDict()
+        self.counters: Dict[str, int] = OrderedDict()
+        # Running phases as [PHASE, START]. Only the innermost phase is timed.
+        self._stack: List[List[Any]] = []
+        self._group: Optional[str] = None
+        self._peak_rss: Optional[int] = None
+
+    def _add_memory(self, phase: Optional[str]):
+        """ Attribute the growth of the peak memory since the last call to `phase` (`None` outside of all phases). """
+        peak = peak_rss_kb()
+        if peak is None:
+            return
+        if phase is not None and self._peak_rss is not None:
+            phase_memory = self.phases[phase]
+            phase_memory["peak_rss_kb"] = max(phase_memory.get("peak_rss_kb", 0), peak)
+            phase_memory["peak_rss_growth_kb"] = phase_memory.get("peak_rss_growth_kb", 0) + peak - self._peak_rss
+        self._peak_rss = peak
+
+    def _add_time(self, phase: str, seconds: float):
+        self.phases[phase]["seconds"] += seconds
+        if self._group is not None:
+            self.groups[self._group]["phases"][phase] = self.groups[self._group]["phases"].get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """ Time spent inside this context counts towards phase `name` (nested phases are excluded). """
+        if not self.enabled:
+            yield
+            return
+        now = time.perf_counter()
+        if len(self._stack) > 0:
+            self._add_time(self._stack[-1][0], now - self._stack[-1][1])
+        self._add_memory(self._stack[-1][0] if len(self._stack) > 0 else None)
+        if name not in self.phases:
+            self.phases[name] = {"seconds": 0.0, "calls": 0}
+        self.phases[name]["calls"] += 1
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add_time(name, now - self._stack.pop()[1])
+            self._add_memory(name)
+            if len(self._stack) > 0:
+                self._stack[-1][1] = now
+
+    @contextmanager
+    def group(self, name: str):
+        """ Everything inside this context is attributed to the definition group `name`. """
+        if not self.enabled or self._group is not None:
+            yield
+            return
+        if name not in self.groups:
+            self.groups[name] = {"seconds": 0.0, "phases": {}, "counters": {}}
+        self._group = name
+        start = time.perf_counter()
+        try:
+            with self.phase("definitions"):
+                yield
+        finally:
+            self.groups[name]["seconds"] += time.perf_counter() - start
+            self._group = None
+
+    def count(self, counter: str, n: int = 1):
+        if not self.enabled:
+            return
+        self.counters[counter] = self.counters.get(counter, 0) + n
+        if self._group is not None:
+            group_counters = self.groups[self._group]["counters"]
+            group_counters[counter] = group_counters.get(counter, 0) + n
+
+    def report(self) -> Dict[str, Any]:
+        """ Machine readable report of all phases, groups and counters. """
+        return {
+            "phases": self.phases,
+            "groups": self.groups,
+            "counters": self.counters,
+            "peak_rss_kb": peak_rss_kb()
+        }
+
+
+def _profiled(phase: str):
+    """ Decorator for methods of classes with a `profiler`. The time spent in the method counts towards `phase`. """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.phase(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _SourceFonts:
+    """
+    Ordered mapping `{ FONT_NAME: FONT }` of source fonts. Each font is only opened when it is first accessed.
+    Fonts that are passed open in `fonts` belong to the caller: they have no path and are never closed.
+    """
+
+    def __init__(self, paths: Dict[str, str], profiler: Optional[_Profiler] = None, open_font: Optional[Callable[[str], Any]] = None, fonts: Dict[str, Any] = {}):
+        self.paths: Dict[str, str] = OrderedDict(paths)
+        self.paths.update((font_name, "") for font_name in fonts if font_name not in self.paths)
+        self.fonts: Dict[str, Any] = dict(fonts)
+        self._given = set(fonts)
+        self.profiler = _Profiler() if profiler is None else profiler
+        self.open_font = open_font
+
+    def _open(self, path: str):
+        if self.open_font is not None:
+            return self.open_font(path)
+        if fontforge is None:
+            raise Exception("The FontForge python module is not available")
+        return fontforge.open(path)
+
+    def keys(self):
+        return self.paths.keys()
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, font_name):
+        return font_name in self.paths
+
+    def __getitem__(self, font_name: str):
+        if font_name not in self.fonts:
+            with self.profiler.phase("open_fonts"):
+                self.fonts[font_name] = self._open(self.paths[font_name])
+            self.profiler.count("fonts_opened")
+        return self.fonts[font_name]
+
+    def is_open(self, font_name: str) -> bool:
+        return font_name in self.fonts
+
+    def close(self, font_name: str):
+        """ Close the source font `font_name` to free its memory. It is opened again if it is accessed later. """
+        if font_name in self._given:
+            return
+        font = self.fonts.pop(font_name, None)
+        if font is None:
+            return
+        font.close()
+        self.profiler.count("fonts_closed")
+
+
+def _compose(outer: Tuple[float, ...], inner: Tuple[float, ...]) -> Tuple[float, ...]:
+    """ The affine transformation `(xx, xy, yx, yy, dx, dy)` that applies `inner` first and then `outer`. """
+    a, b, c, d, e, f = outer
+    a2, b2, c2, d2, e2, f2 = inner
+    return (a*a2 + c*b2, b*a2 + d*b2, a*c2 + c*d2, b*c2 + d*d2, a*e2 + c*f2 + e, b*e2 + d*f2 + f)
+
+
+class _OutlinePen:
+    """
+    Pen (FontForge and fontTools pen protocol) that records a glyph with all references decomposed
+    as JSON serializable list `[[OPERATOR, [[X, Y], ...]], ...]`. `glyph(NAME)` gives the referenced glyphs.
+    """
+
+    def __init__(self, glyph: Callable[[str], Any], transform: Tuple[float, ...] = (1, 0, 0, 1, 0, 0), value: Optional[List[Any]] = None):
+        self.glyph = glyph
+        self.transform = transform
+        self.value: List[Any] = [] if value is None else value
+
+    def _record(self, operator: str, points):
+        a, b, c, d, e, f = self.transform
+        self.value.append([operator, [None if p is None else [a*p[0] + c*p[1] + e, b*p[0] + d*p[1] + f]
+                                      for p in points]])
+
+    def moveTo(self, pt):
+        self._record("moveTo", [pt])
+
+    def lineTo(self, pt):
+        self._record("lineTo", [pt])
+
+    def curveTo(self, *points):
+        self._record("curveTo", points)
+
+    def qCurveTo(self, *points):
+        self._record("qCurveTo", points)
+
+    def closePath(self):
+        self._record("closePath", [])
+
+    def endPath(self):
+        self._record("endPath", [])
+
+    def addComponent(self, glyph_name: str, transformation):
+        self.glyph(glyph_name).draw(_OutlinePen(
+            self.glyph, _compose(self.transform, tuple(transformation)), self.value))
+
+
+def replay_outline(outline: List[Any], pen, factor: float = 1.0):
+    """ Draw an outline recorded by `_OutlinePen` scaled by `factor` to `pen`. """
+    for operator, points in outline:
+        getattr(pen, operator)(*[None if p is None else (p[0] * factor, p[1] * factor) for p in points])
+
+
+class _GlyphCache:
+    """
+    On-disk cache of what the backends read from the source fonts: codepoint index, glyph names, em size,
+    unicode values and the decomposed outlines of used glyphs. There is one JSON file per source font,
+    named after the SHA-256 of the font file. So a changed font is never read from a stale entry.
+    """
+
+    def __init__(self, folder: str, paths: Dict[str, str], profiler: Optional[_Profiler] = None):
+        self.folder = Path(folder)
+        self.paths = paths
+        self.profiler = _Profiler() if profiler is None else profiler
+        # { FONT_NAME: (CACHE_FILE, ENTRY) }
+        self.entries: Dict[str, Tuple[Path, Dict[str, Any]]] = {}
+        self.changed: set = set()
+
+    def _entry(self, font_name: str) -> Dict[str, Any]:
+        if font_name not in self.entries:
+            with self.profiler.phase("glyph_cache"):
+                hash = hashlib.sha256()
+                with open(self.paths[font_name], "rb") as font_file:
+                    for chunk in iter(lambda: font_file.read(1 << 20), b""):
+                        hash.update(chunk)
+                cache_file = self.folder / f"{hash.hexdigest()}.json"
+                entry = {}
+                if cache_file.exists():
+                    with open(cache_file, "r", encoding="utf-8") as f:
+                        entry = json.load(f)
+            self.entries[font_name] = (cache_file, entry)
+        return self.entries[font_name][1]
+
+    def get(self, font_name: str, key: str, compute: Callable[[], Any]) -> Any:
+        """ The cached value `key` of the source font `font_name`. Missing values are computed (and stored by `write()`). """
+        entry = self._entry(font_name)
+        if key in entry:
+            self.profiler.count("glyph_cache.hits")
+        else:
+            self.profiler.count("glyph_cache.misses")
+            entry[key] = compute()
+            self.changed.add(font_name)
+        return entry[key]
+
+    def write(self):
+        """ Write all changed entries. Entries that other builds wrote in the meantime are kept. """
+        with self.profiler.phase("glyph_cache"):
+            os.makedirs(self.folder, exist_ok=True)
+            for font_name in self.changed:
+                cache_file, entry = self.entries[font_name]
+                if cache_file.exists():
+                    with open(cache_file, "r", encoding="utf-8") as f:
+                        entry = dict(json.load(f), **entry)
+                # A fresh folder like in `generate_atomic` so that a shared cache stays readable for everybody
+                temp_folder = tempfile.mkdtemp(dir=self.folder, prefix=f".{cache_file.stem}.")
+                temp_name = os.path.join(temp_folder, cache_file.name)
+                try:
+                    with open(temp_name, "w", encoding="utf-8") as f:
+                        json.dump(entry, f)
+                    os.replace(temp_name, cache_file)
+                finally:
+                    shutil.rmtree(temp_folder, ignore_errors=True)
+            self.changed.clear()
+
+
+def _fea_glyphs(glyphs: Tuple[str, ...]) -> str:
+    """ A glyph or glyph class in feature file syntax. Names are escaped so that they can not clash with keywords. """
+    if len(glyphs) == 1:
+        return "\\" + glyphs[0]
+    return "[" + " ".join("\\" + glyph for glyph in glyphs) + "]"
+
+
+class _FeatureFile:
+    """
+    The lookups of a backend in OpenType feature file syntax. Lookups and subtables are kept in the order
+    FontForge applies them: new lookups and subtables are placed first unless a lookup is placed after another one.
+    """
+
+    def __init__(self):
+        # Substitution lookups that are only called from contextual lookups `{ LOOKUP_NAME: { INPUT: OUTPUT } }`
+        self.substitutions: Dict[str, Dict[Any, str]] = OrderedDict()
+        self.lookup_of_subtable: Dict[str, str] = {}
+        # Contextual lookups in the order they are applied with their rules in subtable order
+        self.context_order: List[str] = []
+        self.context_rules: Dict[str, List[str]] = {}
+        self.context_features: Dict[str, Any] = {}
+        # All glyphs the rules refer to
+        self.glyphs: set = set()
+        # The definition group that the rules added now belong to, and the number of glyphs in the rules of every lookup
+        # by group `{ LOOKUP_NAME: { GROUP: GLYPHS } }` to split the size of a lookup between groups (see `sizes.py`)
+        self.group: Optional[str] = None
+        self.group_weights: Dict[str, Dict[Optional[str], int]] = {}
+
+    def _add_group_weight(self, lookup_name: str, glyphs: int):
+        weights = self.group_weights.setdefault(lookup_name, {})
+        weights[self.group] = weights.get(self.group, 0) + glyphs
+
+    def add_context_lookup(self, lookup_name: str, lookup_feature, lookup_after: Optional[str]):
+        if lookup_name in self.context_rules:
+            return
+        position = 0 if lookup_after is None else self.context_order.index(lookup_after) + 1
+        self.context_order.insert(position, lookup_name)
+        self.context_rules[lookup_name] = []
+        self.context_features[lookup_name] = lookup_feature
+
+    def add_context_rule(self, lookup_name: str, classes: List[Tuple[str, ...]], sub_lookups: List[str], *, look_back: List[Tuple[str, ...]] = [], look_ahead: List[Tuple[str, ...]] = []):
+        """ Rule on the input glyph `classes`. `sub_lookups[i]` is called at input position `i`. """
+        main = [_fea_glyphs(glyphs) + "'" + (f" lookup {sub_lookups[i]}" if i < len(sub_lookups) else "")
+                for i, glyphs in enumerate(classes)]
+        rule = " ".join([_fea_glyphs(glyphs) for glyphs in look_back] + main +
+                        [_fea_glyphs(glyphs) for glyphs in look_ahead])
+        self.context_rules[lookup_name].insert(0, f"sub {rule};")
+        for glyphs in look_back + classes + look_ahead:
+            self.glyphs.update(glyphs)
+        self._add_group_weight(lookup_name, sum(len(glyphs) for glyphs in look_back + classes + look_ahead))
+
+    def add_substitution_lookup(self, lookup_name: str, lookup_sub_name: str):
+        self.substitutions[lookup_name] = OrderedDict()
+        self.lookup_of_subtable[lookup_sub_name] = lookup_name
+
+    def add_substitution(self, lookup_sub_name: str, glyph_in: Any, glyph_out: str):
+        lookup_name = self.lookup_of_subtable[lookup_sub_name]
+        self.substitutions[lookup_name][glyph_in] = glyph_out
+        glyphs_in = glyph_in if isinstance(glyph_in, tuple) else (glyph_in,)
+        self.glyphs.update(glyphs_in)
+        self.glyphs.add(glyph_out)
+        self._add_group_weight(lookup_name, len(glyphs_in) + 1)
+
+    def rule_counts(self) -> Dict[str, int]:
+        """ Number of rules of every lookup `{ LOOKUP_NAME: RULES }`. """
+        counts = OrderedDict((name, len(mapping)) for name, mapping in self.substitutions.items())
+        counts.update((name, len(self.context_rules[name])) for name in self.context_order)
+        return counts
+
+    def text(self, feature) -> str:
+        """ The feature file. `feature` gives the features, scripts and languages as passed to FontForge's `addLookup`. """
+        counts = self.rule_counts()
+        lines = [f"# {len(counts)} lookups, {sum(counts.values())} rules", ""]
+        languages = []
+        for _, scripts in feature:
+            for script, langs in scripts:
+                for lang in langs:
+                    languages.append((script.strip(), lang.strip()))
+        # The default script has to come first
+        languages.sort(key=lambda language: (language[0] != "DFLT", language[1] != "dflt"))
+        for script, lang in languages:
+            lines.append(f"languagesystem {script} {lang};")
+        lines.append("")
+
+        for lookup_name, mapping in self.substitutions.items():
+            lines.append(f"lookup {lookup_name} {{")
+            for glyph_in, glyph_out in mapping.items():
+                glyphs_in = glyph_in if isinstance(glyph_in, tuple) else (glyph_in,)
+                lines.append(f"    sub {' '.join(_fea_glyphs((g,)) for g in glyphs_in)} by {_fea_glyphs((glyph_out,))};")
+            lines.append(f"}} {lookup_name};")
+            lines.append("")
+
+        features: Dict[str, List[str]] = OrderedDict()
+        for lookup_name in self.context_order:
+            lines.append(f"lookup {lookup_name} {{")
+            lines += [f"    {rule}" for rule in self.context_rules[lookup_name]]
+            lines.append(f"}} {lookup_name};")
+            lines.append("")
+            for tag, _ in self.context_features[lookup_name]:
+                features.setdefault(tag, []).append(lookup_name)
+
+        for tag, lookup_names in features.items():
+            lines.append(f"feature {tag} {{")
+            lines += [f"    lookup {lookup_name};" for lookup_name in lookup_names]
+            lines.append(f"}} {tag};")
+        return "\n".join(lines) + "\n"
+
+
+class _TrieNode:
+    """ Node of a prefix trie over glyph sequences. `rule` is the index of the rule ending at this node (if any). """
+
+    def __init__(self):
+        self.children: Dict[str, _TrieNode] = {}
+        self.rule: Optional[int] = None
+
+
 class _EditorBackend:
-    def __init__(self, font: Any, other_fonts: Dict[str, Any]):
+    def __init__(self, font: Any, other_fonts: Union[_SourceFonts, Dict[str, Any]], *, share_lookups: bool = False, deferred: bool = False, profiler: Optional[_Profiler] = None, glyph_cache: Optional[_GlyphCache] = None):
         """
-        other_fonts: { FONT_NAME: FONT }
+        other_fonts: { FONT_NAME: FONT } or `_SourceFonts` that opens the fonts when they are needed.
+        share_lookups: Put the substitutions of all ligatures into shared lookups instead of creating new ones per ligature.
+        deferred: Only record ligatures and macros. The lookups are created by `compile()`.
+        profiler: Records timings and counters of the build (see `_Profiler`).
+        glyph_cache: Read the source fonts through this cache. Glyphs are then imported from their cached outlines
+            and a source font is only opened for data that is not cached yet.
         """
+        self.profiler = _Profiler() if profiler is None else profiler
         self.font = font
-        self.source_fonts: dict[str, Any] = other_fonts
+        # Open fonts in a plain dict are used as they are and never closed (see `release_source_fonts(...)`)
+        self.source_fonts: _SourceFonts = other_fonts if isinstance(other_fonts, _SourceFonts) else _SourceFonts(
+            {}, self.profiler, fonts=other_fonts)
+        self.glyph_cache = glyph_cache
+        self.share_lookups = share_lookups
+        self.deferred = deferred
 
         """
         Dict mapping glyphs to their names.
@@ -101,7 +571,138 @@ class _EditorBackend:
         self.CURL_CLOSE = self.useable_glyphs["Default"]["unicode"]["}"]
         # Macros
         self.macro_length_lookup = "calt.macro.length"
+        self.macro_trie_lookup = "calt.macro.trie"
+        # Prefix of the packed ligature lookups created by `compile()`
+        self.ligature_lookup = "calt.ligatures"
+
+        # Definitions recorded in deferred mode as `(char_in, char_out)`
+        self._pending_ligatures: List[Tuple[List[str], List[str]]] = []
+        self._pending_macros: List[Tuple[List[str], List[str]]] = []
+        self._pending_macro_len = -1
+
+        # Corpus frequencies `{ MACRO: COUNT }` (see `corpus.py`) and the resulting weight of each macro input sequence.
+        # `compile_macros(...)` places the subtables of frequent macros first.
+        self.macro_counts: Dict[str, int] = {}
+        self._macro_weights: Dict[Tuple[str, ...], int] = {}
+        # Definition group of each recorded input sequence and of each new glyph `{ GLYPH_NAME: GROUP }` (see `definition_group(...)`)
+        self._rule_groups: Dict[Tuple[str, ...], Optional[str]] = {}
+        self.glyph_groups: Dict[str, Optional[str]] = OrderedDict()
+
+        # Names of the imported glyphs by `_glyph_content_key(...)`
+        self._imported_by_content: Dict[Tuple[Any, ...], str] = {}
+
+        # Glyphs to copy from the source fonts `{ FONT_NAME: [(GLYPH_NAME, SOURCE_GLYPH)] }`, see `flush_imports()`
+        self._pending_imports: Dict[str, List[Tuple[str, str]]] = OrderedDict()
+        # All copied glyphs as `(GLYPH_NAME, FONT_NAME, SOURCE_GLYPH)` and the marker glyphs `{ MARKER: REFERENCED_GLYPH }`
+        self.imported_glyphs: List[Tuple[str, str, str]] = []
+        self.marker_glyphs: Dict[str, str] = OrderedDict()
+
+        # All lookups in feature file syntax (see `export_features(...)`) or the feature file of `apply_rule_set(...)`
+        self.features = _FeatureFile()
+        self._applied_features: Optional[str] = None
+
+        # Codepoint indexes and glyph names of the source fonts, built on first use
+        self._codepoint_indexes: Dict[str, Dict[int, str]] = {}
+        self._glyph_names: Dict[str, set] = {}
+
+        """
+        Substitution lookups that are shared between ligatures (if `share_lookups` is set).
+        Each entry is `(LOOKUP_NAME, SUBTABLE_NAME, { INPUT: OUTPUT })`.
+        """
+        self._shared_lookups: Dict[str, List[Tuple[str, str, Dict[Any, str]]]] = {
+            "gsub_single": [],
+            "gsub_ligature": []
+        }
 
+    @property
+    def group(self) -> Optional[str]:
+        return self.features.group
+
+    @contextmanager
+    def definition_group(self, group: Optional[str]):
+        """ The rules and glyphs added inside this context belong to the definition `group` (`None` for shared ones). """
+        previous, self.features.group = self.features.group, group
+        try:
+            yield
+        finally:
+            self.features.group = previous
+
+    def _add_in_group(self, group: Optional[str], add: Callable[[], None]):
+        with self.definition_group(group):
+            add()
+
+    def codepoint_index(self, font_name: str) -> Dict[int, str]:
+        """ The `codepoint_index(...)` of the source font `font_name`, computed once per font. """
+        if font_name not in self._codepoint_indexes:
+            index = self._source_data(font_name, "codepoints", lambda: sorted(
+                self._read_codepoint_index(self.source_fonts[font_name]).items()))
+            self._codepoint_indexes[font_name] = dict(
+                (int(codepoint), glyph_name) for codepoint, glyph_name in index)
+        return self._codepoint_indexes[font_name]
+
+    def _read_codepoint_index(self, font) -> Dict[int, str]:
+        return codepoint_index(font)
+
+    def _source_data(self, font_name: str, key: str, compute: Callable[[], Any]) -> Any:
+        """ `compute()` on the source font `font_name`, through the glyph cache if there is one. """
+        if self.glyph_cache is None:
+            return compute()
+        return self.glyph_cache.get(font_name, key, compute)
+
+    def _has_glyph(self, font_name: str, glyph_name: str) -> bool:
+        if self.glyph_cache is None:
+            return glyph_name in self.source_fonts[font_name]
+        if font_name not in self._glyph_names:
+            self._glyph_names[font_name] = set(self._source_data(
+                font_name, "names", lambda: list(self.source_fonts[font_name])))
+        return glyph_name in self._glyph_names[font_name]
+
+    def _glyph_drawable(self, font, glyph_name: str):
+        """ The object of `font` that draws the glyph `glyph_name` to a pen. """
+        return font[glyph_name]
+
+    def _read_outline(self, font, glyph_name: str) -> List[Any]:
+        """ `[WIDTH, OUTLINE]` of the glyph with the outline recorded by `_OutlinePen`. """
+        pen = _OutlinePen(lambda name: self._glyph_drawable(font, name))
+        self._glyph_drawable(font, glyph_name).draw(pen)
+        return [font[glyph_name].width, pen.value]
+
+    def _source_outline(self, font_name: str, glyph_name: str) -> List[Any]:
+        return self._source_data(font_name, f"outline/{glyph_name}",
+                                 lambda: self._read_outline(self.source_fonts[font_name], glyph_name))
+
+    def _source_em(self, font_name: str) -> int:
+        return self._source_data(font_name, "em", lambda: self.source_fonts[font_name].em)
+
+    def _source_content_key(self, font_name: str, glyph_name: str) -> Tuple[Any, ...]:
+        """ The `_glyph_content_key(...)` of a source glyph. With the glyph cache it is computed from the cached outline. """
+        if self.glyph_cache is None:
+            return self._glyph_content_key(self.source_fonts[font_name], glyph_name)
+        width, outline = self._source_outline(font_name, glyph_name)
+        return (self._source_em(font_name), width, json.dumps(outline))
+
+    def _add_outline_glyph(self, glyph_name: str, outline: List[Any], width: int, factor: float):
+        """ Add the glyph `glyph_name` from an outline recorded by `_OutlinePen` scaled by `factor`. """
+        glyph = self.font.createChar(-1, glyph_name)
+        pen = glyph.glyphPen()
+        replay_outline(outline, pen, factor)
+        # The outline is written when the pen is released
+        pen = None
+        glyph.round()
+        glyph.width = width
+
+    @_profiled("import_glyphs")
+    def add_cached_glyphs(self, glyphs: List[Tuple[str, str]], font_name: str):
+        """
+        Add all `(glyph_name, source_glyph)` of the source font `font_name` from the outlines in the glyph cache.
+        The source font is only opened for glyphs that are not cached yet.
+        """
+        factor = self.font.em / self._source_em(font_name)
+        for glyph_name, source_glyph in glyphs:
+            width, outline = self._source_outline(font_name, source_glyph)
+            self._add_outline_glyph(glyph_name, outline, round(width * factor), factor)
+
+    @_profiled("import_glyphs")
     def add_glyph_manually(self, glyph_name: "str", source_glyph: "str", font):
         """
         Add a new glyph to the font. The added glyph has name `glyph_name` and if taken from `font[source_glyph]`.
@@ -115,7 +716,77 @@ class _EditorBackend:
         self.font.selection.none()
         self.font.selection.select(glyph_name)
         self.font.paste()
+        self._scale_glyphs([(glyph_name, source_glyph)], font)
+
+    def _scale_glyphs(self, glyphs: List[Tuple[str, str]], font):
+        """ Scale the glyphs `(glyph_name, source_glyph)` pasted from `font` to the em size of the edited font. """
+        if font.em == self.font.em:
+            return
+        factor = self.font.em / font.em
+        for glyph_name, source_glyph in glyphs:
+            glyph = self.font[glyph_name]
+            glyph.transform((factor, 0, 0, factor, 0, 0))
+            glyph.round()
+            glyph.width = round(font[source_glyph].width * factor)
+
+    @_profiled("import_glyphs")
+    def add_glyphs_manually(self, glyphs: List[Tuple[str, str]], font):
+        """
+        Batch version of `add_glyph_manually(...)`. Adds all `(glyph_name, source_glyph)` pairs with a single copy and paste.
+        """
+        if len(glyphs) == 0:
+            return
+        # Paste fills the selected glyphs in encoding order with the copied glyphs in encoding order
+        glyphs = sorted(glyphs, key=lambda g: font[g[1]].encoding)
+        for glyph_name, _ in glyphs:
+            self.font.createChar(-1, glyph_name)
+
+        font.selection.none()
+        font.selection.select(*[source_glyph for _, source_glyph in glyphs])
+        font.copy()
+
+        self.font.selection.none()
+        self.font.selection.select(*[glyph_name for glyph_name, _ in glyphs])
+        self.font.paste()
+        self._scale_glyphs(glyphs, font)
 
+    def release_source_fonts(self, font_names: Optional[Iterable[str]] = None):
+        """
+        Import all pending glyphs and close the source fonts `font_names` (default: all).
+        Their codepoint indexes are kept, a closed font is only opened again if another glyph is taken from it.
+        """
+        self.flush_imports()
+        for font_name in list(self.source_fonts.keys()) if font_names is None else font_names:
+            self.source_fonts.close(font_name)
+
+    def flush_imports(self):
+        """
+        Copy all glyphs collected by `use_glyph(...)` into the font with one copy and paste per source font.
+        Called before any lookup refers to the glyphs.
+        """
+        pending, self._pending_imports = self._pending_imports, OrderedDict()
+        for font_name, glyphs in pending.items():
+            self.profiler.count(f"glyphs_imported.{font_name}", len(glyphs))
+            self.imported_glyphs += [(glyph_name, font_name, source_glyph) for glyph_name, source_glyph in glyphs]
+            if self.glyph_cache is None:
+                self.add_glyphs_manually(glyphs, self.source_fonts[font_name])
+            else:
+                self.add_cached_glyphs(glyphs, font_name)
+
+    @classmethod
+    def _glyph_content_key(cls, font, glyph_name: str) -> Tuple[Any, ...]:
+        """ Key that is equal for glyphs with the same outlines, referenced glyphs and width at the same em size. """
+        glyph = font[glyph_name]
+        contours = tuple(
+            (contour.closed,) + tuple((point.x, point.y, point.on_curve) for point in contour)
+            for contour in glyph.foreground
+        )
+        # References are compared by content since the same name can be a different glyph in another font
+        references = tuple((cls._glyph_content_key(font, name), tuple(matrix))
+                           for name, matrix in glyph.references)
+        return (font.em, glyph.width, references, contours)
+
+    @_profiled("use_glyph")
     def use_glyph(self, glyph: str, *, fonts: Optional[List[str]] = None, format: Literal["unicode", "name"] = "unicode"):
         """
         Use the `glyph` from the first matching font in the list of `fonts`. The glyph is added if nessesary.
@@ -132,15 +803,20 @@ class _EditorBackend:
 
         for font_name in fonts:
             if font_name in self.useable_glyphs and glyph in self.useable_glyphs[font_name][format]:
+                self.profiler.count("useable_glyphs.hits")
                 return self.useable_glyphs[font_name][format][glyph]
             if font_name == "Default":
                 continue
+            if font_name not in self.source_fonts:
+                raise Exception(f"Unknown font `{font_name}`")
 
-            font = self.source_fonts[font_name]
+            # Source fonts are only read through the codepoint index and the `_source_*` methods, so the glyph cache can answer
             glyph_name = None
             if format == "unicode":
-                glyph_name = find_unicode_glyph(font, glyph)
-            elif glyph in font:
+                if len(glyph) != 1:
+                    raise Exception(f"`{glyph}` is not length 1")
+                glyph_name = self.codepoint_index(font_name).get(ord(glyph))
+            elif self._has_glyph(font_name, glyph):
                 glyph_name = glyph
 
             if glyph_name is not None:
@@ -152,16 +828,74 @@ class _EditorBackend:
                     ''.join([c for c in font_name if c.isalpha()]) + \
                     "."+glyph_name
 
-                self.useable_glyphs[font_name]["name"][glyph_name] = new_name
-                if font[glyph_name].unicode != -1:
-                    self.useable_glyphs[font_name]["unicode"][chr(
-                        font[glyph_name].unicode)] = new_name
+                # Identical glyphs from different routes are only imported once
+                content_key = self._source_content_key(font_name, glyph_name)
+                is_duplicate = content_key in self._imported_by_content
+                if is_duplicate:
+                    new_name = self._imported_by_content[content_key]
+                    self.profiler.count("glyphs_deduplicated")
+                else:
+                    self._imported_by_content[content_key] = new_name
 
-                self.add_glyph_manually(new_name, glyph_name, font)
+                self.useable_glyphs[font_name]["name"][glyph_name] = new_name
+                unicode = self._source_data(font_name, f"unicode/{glyph_name}",
+                                            lambda: self.source_fonts[font_name][glyph_name].unicode)
+                if unicode != -1:
+                    self.useable_glyphs[font_name]["unicode"][chr(unicode)] = new_name
+
+                self.profiler.count("useable_glyphs.misses")
+                if not is_duplicate:
+                    self._pending_imports.setdefault(
+                        font_name, []).append((new_name, glyph_name))
+                    self.glyph_groups[new_name] = self.group
                 return new_name
+        self.profiler.count("useable_glyphs.misses")
         raise Exception(
             f"Glyph '{glyph}' (format='{format}') not found in given fonts.")
 
+    @_profiled("use_glyph")
+    def resolve_unicode_glyphs(self, glyphs: Iterable[str], *, fonts: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Find the font that provides each of the single character unicode strings in `glyphs`.
+        All glyphs are resolved in one pass over the fallback chain. Nothing is added to the font.
+
+        Returns a dict `{ GLYPH: FONT_NAME }` with `None` for glyphs that are in none of the `fonts`.
+        """
+        if fonts is None:
+            fonts = ["Default"] + list(self.source_fonts.keys())
+
+        resolved: Dict[str, Optional[str]] = dict.fromkeys(glyphs)
+        pending = list(resolved.keys())
+        for font_name in fonts:
+            if len(pending) == 0:
+                break
+            if font_name != "Default" and font_name not in self.source_fonts:
+                raise Exception(f"Unknown font `{font_name}`")
+            cached = self.useable_glyphs.get(font_name, {"unicode": {}})["unicode"]
+            index = None if font_name == "Default" else self.codepoint_index(font_name)
+            remaining = []
+            for glyph in pending:
+                if len(glyph) != 1:
+                    raise Exception(f"`{glyph}` is not length 1")
+                if glyph in cached or (index is not None and ord(glyph) in index):
+                    resolved[glyph] = font_name
+                else:
+                    remaining.append(glyph)
+            pending = remaining
+        return resolved
+
+    def use_glyphs(self, glyphs: List[str], *, fonts: Optional[List[str]] = None) -> List[str]:
+        """
+        Bulk version of `use_glyph(glyph, fonts=fonts, format="unicode")` for every glyph in `glyphs`.
+        """
+        font_names: Dict[str, str] = {}
+        for glyph, font_name in self.resolve_unicode_glyphs(glyphs, fonts=fonts).items():
+            if font_name is None:
+                raise Exception(
+                    f"Glyph '{glyph}' (format='unicode') not found in given fonts.")
+            font_names[glyph] = font_name
+        return [self.use_glyph(glyph, fonts=[font_names[glyph]]) for glyph in glyphs]
+
     def use_glyph_format(self, glyphs: str, *, fonts: Optional[List[str]] = None, format: Literal["unicode", "advanced"] = "unicode") -> List[str]:
         """
         Parses glyphs into a sequence of character names. All glyphs are added if nessesary.
@@ -178,8 +912,7 @@ class _EditorBackend:
         glyph_list = []
 
         if format == "unicode":
-            for char in list(glyphs):
-                glyph_list.append(self.use_glyph(char, fonts=fonts))
+            glyph_list = self.use_glyphs(list(glyphs), fonts=fonts)
         elif format == "advanced":
             name_list = glyphs.split(" ")
             for glyph_name in name_list:
@@ -197,6 +930,7 @@ class _EditorBackend:
             raise Exception("Unknown format")
         return glyph_list
 
+    @_profiled("lookups")
     def add_advanced_ligature(
         self,
         char_in: List[str],
@@ -237,47 +971,308 @@ class _EditorBackend:
             i): return f"lookup.sub.N{lookup_number}.sub.{i}"
 
         # Lookups for all but last char
+        sub_lookups = []
         for i in range(len(char_out) - 1):
-            self.font.addLookup(gsub_lookup_name(
-                i), 'gsub_single', (), (), "calt.macro.length")
-            self.font.addLookupSubtable(
-                gsub_lookup_name(i), gsub_lookup_sub_name(i))
-            self.font[char_in[i]].addPosSub(
-                gsub_lookup_sub_name(i), char_out[i])
+            sub_lookups.append(self.substitution_lookup(
+                'gsub_single', {char_in[i]: char_out[i]}, gsub_lookup_name(i), gsub_lookup_sub_name(i)))
 
         # Lookup for last char
         i = len(char_out)-1
-        self.font.addLookup(gsub_lookup_name(
-            i), 'gsub_ligature', (), (), "calt.macro.length")
-        self.font.addLookupSubtable(
-            gsub_lookup_name(i), gsub_lookup_sub_name(i))
-        self.font[char_out[i]].addPosSub(
-            gsub_lookup_sub_name(i), tuple(char_in[i:]))
-
-        # Call lookups from context
-        main_patern = ' '.join(f"{char_in[i]} @<{gsub_lookup_name(i)}>" for i in range(
-            len(char_out))) + ' '.join([f"{c}" for c in char_in[len(char_out):]])
+        sub_lookups.append(self.substitution_lookup(
+            'gsub_ligature', {tuple(char_in[i:]): char_out[i]}, gsub_lookup_name(i), gsub_lookup_sub_name(i)))
+
+        self._context_lookup(ctx_lookup_name, lookup_feature, lookup_after)
+        self._add_glyph_subtable(ctx_lookup_name, ctx_lookup_sub_name,
+                                 look_back, char_in, sub_lookups, look_ahead)
+        self.profiler.count("subtables")
+
+    def _add_glyph_subtable(self, ctx_lookup_name: str, ctx_lookup_sub_name: str, look_back: List[str], char_in: List[str], sub_lookups: List[str], look_ahead: List[str]):
+        """ Add the subtable `look_back | char_in | look_ahead` to the contextual lookup. `sub_lookups[i]` is called at `char_in[i]`. """
+        self.features.add_context_rule(ctx_lookup_name, [(glyph,) for glyph in char_in], sub_lookups,
+                                       look_back=[(glyph,) for glyph in look_back], look_ahead=[(glyph,) for glyph in look_ahead])
+        main_patern = ' '.join(f"{char_in[i]} @<{sub_lookups[i]}>" for i in range(
+            len(sub_lookups))) + ' '.join([f"{c}" for c in char_in[len(sub_lookups):]])
         pattern = f"{' '.join(look_back)} | {main_patern} | {' '.join(look_ahead)}"
 
+        self.font.addContextualSubtable(
+            ctx_lookup_name,
+            ctx_lookup_sub_name,
+            'glyph',
+            pattern
+        )
+
+    def _context_lookup(self, ctx_lookup_name: str, lookup_feature, lookup_after):
+        """ Create the contextual lookup `ctx_lookup_name` unless it exists. New subtables are placed first in the lookup. """
+        if ctx_lookup_name in self.font.gsub_lookups:
+            return
+        self.profiler.count("lookups")
+        self.features.add_context_lookup(ctx_lookup_name, lookup_feature, lookup_after)
         if lookup_after is None:
             self.font.addLookup(
                 ctx_lookup_name, 'gsub_contextchain', (), lookup_feature)
         else:
             self.font.addLookup(
                 ctx_lookup_name, 'gsub_contextchain', (), lookup_feature, lookup_after)
+
+    @_profiled("lookups")
+    def add_class_ligature(
+        self,
+        char_in: List[Optional[str]],
+        arg_index: int,
+        args: Dict[str, List[str]],
+        *,
+        lookup_name=None,
+        lookup_feature=(),
+        lookup_after=None
+    ):
+        """
+        Add contextual ligatures `char_in -> args[ARG]` that only differ in the glyph `ARG` at position `arg_index` of `char_in`.
+        Compatible ligatures are combined into a single class based rule. The glyph class of `ARG` is mapped through one substitution lookup.
+
+        Arguments:
+        char_in -- The characters to be replaced. The entry at `arg_index` is ignored.
+        arg_index -- The position of the argument glyph inside `char_in`.
+        args -- Dictionary `{ ARG: char_out }` of argument glyphs and the characters to replace with.
+
+        Keyword Arguments: See `add_advanced_ligature(...)`.
+        """
+        # The glyphs of `char_in` besides the argument
+        fixed: Dict[int, str] = {i: g for i, g in enumerate(char_in) if i != arg_index and g is not None}
+        fixed_glyphs = set(fixed.values())
+
+        # Group the arguments by everything that the rule does not take from the argument class
+        groups: Dict[Tuple[Any, ...], Dict[str, List[str]]] = OrderedDict()
+        single_rules: List[Tuple[str, List[str]]] = []
+        for arg, char_out in args.items():
+            if len(char_in) < len(char_out):
+                raise Exception("Can only replace by shorter sequence")
+            if arg in fixed_glyphs:
+                # A glyph can only be in one class
+                single_rules.append((arg, char_out))
+                continue
+            last = len(char_out) - 1
+            key = (len(char_out),) + tuple(
+                char_out[i] if i != arg_index else None for i in range(last)
+            ) + (char_out[last] if arg_index < last else None,)
+            groups.setdefault(key, OrderedDict())[arg] = char_out
+
+        for group in groups.values():
+            if len(group) == 1:
+                single_rules += list(group.items())
+                continue
+
+            if not hasattr(self, "_lookup_count"):
+                self._lookup_count = 0
+            lookup_number = self._lookup_count
+            self._lookup_count = self._lookup_count + 1
+
+            ctx_lookup_name = f"lookup.ctx.N{lookup_number}" if lookup_name is None else lookup_name
+            ctx_lookup_sub_name = f"lookup.ctx.sub.N{lookup_number}"
+            def gsub_lookup_name(i): return f"lookup.N{lookup_number}.{i}"
+            def gsub_lookup_sub_name(
+                i): return f"lookup.sub.N{lookup_number}.sub.{i}"
+
+            char_out_len = len(next(iter(group.values())))
+            sub_lookups = []
+            for i in range(char_out_len):
+                if i < char_out_len - 1:
+                    mapping = {(arg if i == arg_index else fixed[i]): char_out[i]
+                               for arg, char_out in group.items()}
+                    lookup_type = "gsub_single"
+                else:
+                    mapping = {tuple(arg if j == arg_index else fixed[j] for j in range(i, len(char_in))): char_out[i]
+                               for arg, char_out in group.items()}
+                    lookup_type = "gsub_ligature"
+                sub_lookups.append(self.substitution_lookup(
+                    lookup_type, mapping, gsub_lookup_name(i), gsub_lookup_sub_name(i)))
+
+            classes = [tuple(group.keys()) if i == arg_index else (fixed[i],)
+                       for i in range(len(char_in))]
+            self._context_lookup(ctx_lookup_name, lookup_feature, lookup_after)
+            self._add_class_subtable(
+                ctx_lookup_name, ctx_lookup_sub_name, classes, sub_lookups)
+            self.profiler.count("subtables")
+
+        for arg, char_out in single_rules:
+            self.add_advanced_ligature(
+                [arg if i == arg_index else fixed[i] for i in range(len(char_in))],
+                char_out,
+                lookup_name=lookup_name,
+                lookup_feature=lookup_feature,
+                lookup_after=lookup_after
+            )
+
+    def _add_class_subtable(self, ctx_lookup_name: str, ctx_lookup_sub_name: str, classes: List[Tuple[str, ...]], sub_lookups: List[str], look_back: List[Tuple[str, ...]] = []):
+        """
+        Add a class based subtable to the contextual lookup. `classes[i]` are the glyphs at input position `i`, `sub_lookups[i]` is called there.
+        `look_back` are the glyph classes before the input.
+        """
+        self.features.add_context_rule(ctx_lookup_name, classes, sub_lookups, look_back=look_back)
+
+        def class_numbers(sequence: List[Tuple[str, ...]]) -> Tuple[List[int], Tuple[Tuple[str, ...], ...]]:
+            # One class per distinct glyph tuple, class 0 stays empty
+            class_list: List[Tuple[str, ...]] = [()]
+            class_of: Dict[Tuple[str, ...], int] = {}
+            for glyphs in sequence:
+                if glyphs not in class_of:
+                    class_of[glyphs] = len(class_list)
+                    class_list.append(glyphs)
+            return [class_of[glyphs] for glyphs in sequence], tuple(class_list)
+
+        main_numbers, mclasses = class_numbers(classes)
+        back_numbers, bclasses = class_numbers(look_back)
+        main_pattern = ' '.join(
+            f"{main_numbers[i]}" +
+            (f" @<{sub_lookups[i]}>" if i < len(sub_lookups) else "")
+            for i in range(len(classes)))
+
         self.font.addContextualSubtable(
             ctx_lookup_name,
             ctx_lookup_sub_name,
-            'glyph',
-            pattern
+            "class",
+            f"{' '.join(str(n) for n in back_numbers)} | {main_pattern} | ",
+            bclasses=bclasses,
+            fclasses=((), ),
+            mclasses=mclasses
         )
 
+    def add_ligature(self, char_in: List[str], char_out: List[str]):
+        """ Add a ligature `char_in -> char_out` in the default feature (recorded in deferred mode). """
+        if self.deferred:
+            self._rule_groups[tuple(char_in)] = self.group
+            self._pending_ligatures.append((char_in, char_out))
+        else:
+            self.add_advanced_ligature(
+                char_in, char_out, lookup_feature=self.feature)
+
+    def substitution_lookup(self, lookup_type: Literal["gsub_single", "gsub_ligature"], mapping: Dict[Any, str], lookup_name: str, lookup_sub_name: str) -> str:
+        """
+        Returns the name of a lookup that performs all substitutions in `mapping`. The lookup is meant to be called from a contextual lookup.
+
+        lookup_type -- "gsub_single" with `mapping = { GLYPH_IN: GLYPH_OUT }`
+            or "gsub_ligature" with `mapping = { (GLYPHS_IN, ...): GLYPH_OUT }`.
+        lookup_name, lookup_sub_name -- Names for the lookup and its subtable if a new lookup is created.
+
+        With `share_lookups` an existing lookup is reused if it already contains the substitutions or can take them without conflict.
+        """
+        self.flush_imports()
+        if self.share_lookups:
+            for shared_name, shared_sub_name, shared_mapping in self._shared_lookups[lookup_type]:
+                if self._compatible_substitutions(lookup_type, shared_mapping, mapping):
+                    for glyph_in, glyph_out in mapping.items():
+                        if glyph_in not in shared_mapping:
+                            self._add_substitution(
+                                shared_sub_name, glyph_in, glyph_out)
+                            shared_mapping[glyph_in] = glyph_out
+                    return shared_name
+            number = len(self._shared_lookups[lookup_type])
+            lookup_name = f"lookup.shared.{lookup_type}.{number}"
+            lookup_sub_name = f"lookup.sub.shared.{lookup_type}.{number}"
+
+        self._new_substitution_lookup(lookup_type, lookup_name, lookup_sub_name)
+        self.profiler.count("lookups")
+        self.profiler.count("subtables")
+        for glyph_in, glyph_out in mapping.items():
+            self._add_substitution(lookup_sub_name, glyph_in, glyph_out)
+
+        if self.share_lookups:
+            self._shared_lookups[lookup_type].append(
+                (lookup_name, lookup_sub_name, dict(mapping)))
+        return lookup_name
+
+    def _new_substitution_lookup(self, lookup_type: str, lookup_name: str, lookup_sub_name: str):
+        """ Create a substitution lookup with one subtable that is only called from contextual lookups. """
+        self.features.add_substitution_lookup(lookup_name, lookup_sub_name)
+        # In deferred mode ligatures and scripts are added before the macro length lookup exists
+        if self.macro_length_lookup in self.font.gsub_lookups:
+            self.font.addLookup(lookup_name, lookup_type, (), (), self.macro_length_lookup)
+        else:
+            self.font.addLookup(lookup_name, lookup_type, (), ())
+        self.font.addLookupSubtable(lookup_name, lookup_sub_name)
+
+    def _add_substitution(self, lookup_sub_name: str, glyph_in: Any, glyph_out: str):
+        self.features.add_substitution(lookup_sub_name, glyph_in, glyph_out)
+        if isinstance(glyph_in, tuple):
+            self.font[glyph_out].addPosSub(lookup_sub_name, glyph_in)
+        else:
+            self.font[glyph_in].addPosSub(lookup_sub_name, glyph_out)
+
+    @staticmethod
+    def _compatible_substitutions(lookup_type: str, existing: Dict[Any, str], mapping: Dict[Any, str]) -> bool:
+        """
+        Checks if the substitutions in `mapping` can be added to a lookup with the substitutions `existing`
+        without changing the result for any glyph sequence the contextual lookups call it on.
+        """
+        for glyph_in, glyph_out in mapping.items():
+            if glyph_in in existing:
+                if existing[glyph_in] != glyph_out:
+                    return False
+            elif lookup_type == "gsub_ligature":
+                # A ligature of another length starting with the same glyph could match instead
+                if any(other[0] == glyph_in[0] and len(other) != len(glyph_in) for other in existing):
+                    return False
+        return True
+
+    def prune_glyphs(self) -> List[str]:
+        """
+        Remove all glyphs that can not be displayed: glyphs that are neither in the cmap nor produced by a substitution
+        (of our lookups or the lookups of the font) from a reachable glyph, nor referenced by a reachable composite.
+        Returns the names of the removed glyphs.
+        """
+        self.flush_imports()
+        reachable = set(name for name in (".notdef", ".null", "nonmarkingreturn") if name in self.font)
+        targets: Dict[str, List[str]] = {}
+        ligatures: List[Tuple[str, Tuple[str, ...]]] = []
+        for name in self.font:
+            glyph = self.font[name]
+            if glyph.unicode != -1 or glyph.altuni is not None:
+                reachable.add(name)
+            targets[name] = [ref[0] for ref in glyph.references]
+            for possub in glyph.getPosSub("*"):
+                if possub[1] in ("Substitution", "AltSubs", "MultSubs"):
+                    targets[name] += list(possub[2:])
+                elif possub[1] == "Ligature":
+                    # Ligatures are stored on the ligature glyph with the components
+                    ligatures.append((name, tuple(possub[2:])))
+
+        # Propagate until nothing changes
+        stack = list(reachable)
+        while len(stack) > 0:
+            while len(stack) > 0:
+                for target in targets.get(stack.pop(), []):
+                    if target not in reachable and target in targets:
+                        reachable.add(target)
+                        stack.append(target)
+            for ligature, components in ligatures:
+                if ligature not in reachable and all(c in reachable for c in components):
+                    reachable.add(ligature)
+                    stack.append(ligature)
+
+        removed = [name for name in targets if name not in reachable]
+        for name in removed:
+            self.font.removeGlyph(name)
+        self.profiler.count("glyphs_pruned", len(removed))
+        return removed
+
     ## MACROS ##
     def macro_glyph_name(self, length: "int"):
         """ Glyph that indicates the start of a macro of given length for contextual lookups. """
         return f"macro.{length}.liga"
 
+    def add_marker_glyph(self, marker: str, reference: Optional[str] = None):
+        """
+        Add the marker glyph `marker`, a composite that references the glyph `reference` (defaults to the backslash)
+        instead of a copy of its outline.
+        """
+        reference = self.BACKSLASH if reference is None else reference
+        glyph = self.font.createChar(-1, marker)
+        glyph.addReference(reference)
+        glyph.width = self.font[reference].width
+        self.marker_glyphs[marker] = reference
+        self.glyph_groups.setdefault(marker, self.group)
+
     # The heavy lifting for macros is done here
+    @_profiled("lookups")
     def lookup_macros(self, max_len: "int"):
         """ Replaces the '\\' in any macro of length `n` smaller than `max_len` with the glyph `self.macro_glyph_name(n)`. """
 
@@ -286,6 +1281,8 @@ class _EditorBackend:
         if not macro_length_lookup in self.font.gsub_lookups:
             self.font.addLookup(macro_length_lookup,
                                 "gsub_contextchain", (), self.feature)
+            self.features.add_context_lookup(macro_length_lookup, self.feature, None)
+            self.profiler.count("lookups")
 
         def lookup_name(i): return f"lookup.macro.length.{length}"
         def lookup_sub_name(i): return f"lookup.sub.macro.length.{length}"
@@ -295,20 +1292,24 @@ class _EditorBackend:
         if max_len <= self._max_macro_len:
             return
 
-        # Add contextual lookup for all length values (if not done so far)
-        for length in range(self._max_macro_len+2, max_len+2):
+        self.flush_imports()
 
+        for length in range(self._max_macro_len+2, max_len+2):
             if not self.macro_glyph_name(length) in self.font:
-                self.add_glyph_manually(self.macro_glyph_name(
-                    length), source_glyph=self.BACKSLASH, font=self.font)
+                self.add_marker_glyph(self.macro_glyph_name(length))
+
+        # Add contextual lookup for all length values (if not done so far)
+        for length in range(self._max_macro_len+2, max_len+2):
 
             # Create single sub lookup for macro character
             self.font.addLookup(lookup_name(length), "gsub_single", (), ())
             self.font.addLookupSubtable(
                 lookup_name(length), lookup_sub_name(length))
+            self.features.add_substitution_lookup(lookup_name(length), lookup_sub_name(length))
 
             self.font[self.BACKSLASH].addPosSub(
                 lookup_sub_name(length), self.macro_glyph_name(length))
+            self.features.add_substitution(lookup_sub_name(length), self.BACKSLASH, self.macro_glyph_name(length))
 
             # Add contextual lookup
             self.font.addContextualSubtable(
@@ -320,88 +1321,586 @@ class _EditorBackend:
                 fclasses=((), LETTERS),
                 mclasses=((), (self.BACKSLASH,))
             )
+            self.features.add_context_rule(macro_length_lookup, [(self.BACKSLASH,)], [lookup_name(length)],
+                                           look_ahead=[LETTERS] * length)
+            self.profiler.count("lookups")
+            self.profiler.count("subtables", 2)
 
         self._max_macro_len = max_len
 
     def add_macro(self, macro: "str", replacement: List[str]):
-        self.lookup_macros(len(macro))
-
         input_chars = [self.macro_glyph_name(
             len(macro))] + self.use_glyph_format(macro, format="unicode")
+        self._add_macro_rule(len(macro), input_chars, replacement, self.macro_counts.get(macro, 0))
+
+    def _add_macro_rule(self, macro_len: int, char_in: List[str], char_out: List[str], weight: int = 0):
+        """ Add the contextual ligature of a macro of length `macro_len` (recorded in deferred mode with its corpus `weight`). """
+        if self.deferred:
+            self._macro_weights[tuple(char_in)] = weight
+            self._rule_groups[tuple(char_in)] = self.group
+            self._pending_macro_len = max(self._pending_macro_len, macro_len)
+            self._pending_macros.append((char_in, char_out))
+            return
 
+        self.lookup_macros(macro_len)
         self.add_advanced_ligature(
-            input_chars,
-            replacement,
+            char_in,
+            char_out,
             lookup_feature=self.feature,
             lookup_after=self.macro_length_lookup
         )
 
     def add_macro_font(self, macro: str, map: Dict[str, List[str]]):
-        """ For macros of the form `\\mathbb N` or `\\mathbb{N}` """
-        self.lookup_macros(len(macro))
-
+        """
+        For macros of the form `\\mathbb N` or `\\mathbb{N}`.
+        Each form is a class based rule on the argument glyph, so the number of lookups does not grow with the size of `map`.
+        """
         macro_glyph = self.macro_glyph_name(len(macro))
+        char_in = [macro_glyph] + \
+            self.use_glyph_format(macro, fonts=["Default"])
 
+        args: Dict[str, List[str]] = OrderedDict()
+        weights: Dict[str, int] = {}
         for character, replacement in map.items():
+            arg_glyph = self.use_glyph(character, fonts=["Default"])
+            args[arg_glyph] = replacement
+            weights[arg_glyph] = self.macro_counts.get(argument_key(macro, character), 0)
 
-            char_in = [macro_glyph] + \
-                self.use_glyph_format(macro, fonts=["Default"])
-
-            arg_glyph: str = self.use_glyph(character, fonts=["Default"])
-
+        forms: List[List[Optional[str]]] = [
             # without { }
-            self.add_advanced_ligature(
-                char_in+[self.SPACE, arg_glyph],
-                replacement,
-                lookup_feature=self.feature,
-                lookup_after=self.macro_length_lookup
-            )
-            self.add_advanced_ligature(
-                char_in+[self.NO_BREAK_SPACE, arg_glyph],
-                replacement,
-                lookup_feature=self.feature,
-                lookup_after=self.macro_length_lookup
-            )
-
+            [self.SPACE, None],
+            [self.NO_BREAK_SPACE, None],
             # with { }
-            self.add_advanced_ligature(
-                char_in+[self.CURL_OPEN, arg_glyph, self.CURL_CLOSE],
-                replacement,
+            [self.CURL_OPEN, None, self.CURL_CLOSE]
+        ]
+        for form in forms:
+            if self.deferred:
+                # Merged into class based rules by `compile_macros`
+                for arg_glyph, replacement in args.items():
+                    self._add_macro_rule(
+                        len(macro), char_in + [arg_glyph if g is None else g for g in form], replacement, weights[arg_glyph])
+                continue
+
+            self.lookup_macros(len(macro))
+            self.add_class_ligature(
+                char_in + form,
+                len(char_in) + form.index(None),
+                args,
                 lookup_feature=self.feature,
                 lookup_after=self.macro_length_lookup
             )
 
+    @_profiled("lookups")
+    def add_scripts(self, prefix: str, args: Dict[str, str], *, unbraced: Iterable[str] = (), max_length: int = 8):
+        """
+        Replace the arguments of `PREFIX{ARGS}` (up to `max_length` arguments) and of a run `PREFIX ARGS` of `unbraced` arguments
+        by their replacement in `args = { ARG: REPLACEMENT }`, e.g. `^{12}` and `^12` by `¹²`.
+
+        Two lookups with class based rules handle any combination of arguments. The first one replaces the arguments
+        and the prefix and braces by marker glyphs, the second one joins the markers into the replaced arguments.
+        """
+        if not hasattr(self, "_script_count"):
+            self._script_count = 0
+        number = self._script_count
+        self._script_count += 1
+
+        markers = {glyph: f"{glyph}.script" for glyph in (prefix, self.CURL_OPEN, self.CURL_CLOSE)}
+        for glyph, marker in markers.items():
+            if marker not in self.font:
+                self.add_marker_glyph(marker, glyph)
+        prefix_marker, open_marker, close_marker = markers[prefix], markers[self.CURL_OPEN], markers[self.CURL_CLOSE]
+        arg_class = tuple(args)
+        out_class = tuple(OrderedDict.fromkeys(args.values()))
+        unbraced_class = tuple(arg for arg in args if arg in set(unbraced))
+        unbraced_out_class = tuple(OrderedDict.fromkeys(args[arg] for arg in unbraced_class))
+
+        def substitution(lookup_type, mapping: Dict[Any, str], what: str) -> str:
+            return self.substitution_lookup(lookup_type, mapping, f"lookup.scripts.{number}.{what}", f"lookup.sub.scripts.{number}.{what}")
+
+        # Replace the arguments, the prefix and the braces. A run without braces continues after a replaced argument.
+        to_prefix = substitution("gsub_single", {prefix: prefix_marker}, "prefix")
+        to_args = substitution("gsub_single", dict(args), "args")
+        mark_lookup = f"calt.scripts.{number}"
+        self._context_lookup(mark_lookup, self.feature, None)
+        rules: List[Tuple[List[Tuple[str, ...]], List[str], List[Tuple[str, ...]]]] = []
+        if len(unbraced_class) > 0:
+            rules.append(([unbraced_class], [to_args], [unbraced_out_class]))
+            rules.append(([(prefix,), unbraced_class], [to_prefix, to_args], []))
+        to_open = substitution("gsub_single", {self.CURL_OPEN: open_marker}, "open")
+        to_close = substitution("gsub_single", {self.CURL_CLOSE: close_marker}, "close")
+        for length in range(1, max_length + 1):
+            rules.append(([(prefix,), (self.CURL_OPEN,)] + [arg_class] * length + [(self.CURL_CLOSE,)],
+                          [to_prefix, to_open] + [to_args] * length + [to_close], []))
+        # New subtables are placed first
+        for i, (classes, sub_lookups, look_back) in enumerate(rules):
+            self._add_class_subtable(mark_lookup, f"{mark_lookup}.sub.{i}", classes, sub_lookups, look_back)
+            self.profiler.count("subtables")
+
+        # Remove the markers with ligatures. A single braced argument is joined with both braces at once.
+        join_lookup = f"{mark_lookup}.join"
+        self._context_lookup(join_lookup, self.feature, mark_lookup)
+        join_rules: List[Tuple[List[Tuple[str, ...]], List[str]]] = []
+        if len(unbraced_class) > 0:
+            join_rules.append(([(prefix_marker,), unbraced_out_class], [substitution(
+                "gsub_ligature", {(prefix_marker, out): out for out in unbraced_out_class}, "join.prefix")]))
+        join_rules.append(([out_class, (close_marker,)], [substitution(
+            "gsub_ligature", {(out, close_marker): out for out in out_class}, "join.close")]))
+        join_rules.append(([(prefix_marker,), (open_marker,), out_class], [substitution(
+            "gsub_ligature", {(prefix_marker, open_marker, out): out for out in out_class}, "join.open")]))
+        join_rules.append(([(prefix_marker,), (open_marker,), out_class, (close_marker,)], [substitution(
+            "gsub_ligature", {(prefix_marker, open_marker, out, close_marker): out for out in out_class}, "join.single")]))
+        for i, (classes, sub_lookups) in enumerate(join_rules):
+            self._add_class_subtable(join_lookup, f"{join_lookup}.sub.{i}", classes, sub_lookups)
+            self.profiler.count("subtables")
+
+    @_profiled("lookups")
+    def compile(self):
+        """
+        Create the lookups for all ligatures and macros recorded in deferred mode.
+
+        Ligatures are packed into as few lookups as possible (see `pack_ligatures(...)`) and the subtables
+        of every lookup are ordered by their first glyph (see `order_by_first_glyph(...)`).
+        """
+        self.flush_imports()
+        ligatures, self._pending_ligatures = self._pending_ligatures, []
+        # The latest ligature has the highest priority
+        packed = self.pack_ligatures(ligatures[::-1])
+        # New lookups and subtables are placed first: add them in reverse order
+        for n in reversed(range(len(packed))):
+            ordered = self.order_by_first_glyph(
+                [({char_in[0]}, (char_in, char_out)) for char_in, char_out in packed[n]])
+            for char_in, char_out in reversed(ordered):
+                with self.definition_group(self._rule_groups.get(tuple(char_in))):
+                    self.add_advanced_ligature(
+                        char_in, char_out, lookup_name=f"{self.ligature_lookup}.{n}", lookup_feature=self.feature)
+
+        macros, self._pending_macros = self._pending_macros, []
+        if len(macros) > 0:
+            self.lookup_macros(self._pending_macro_len)
+            self.compile_macros(macros)
+
+    @staticmethod
+    def ligatures_interact(a: Tuple[List[str], List[str]], b: Tuple[List[str], List[str]]) -> bool:
+        """
+        Whether the ligatures `a` and `b` (`(char_in, char_out)`) can change each others result when they are in the same lookup.
+        This is the case if their inputs can overlap at different start positions or if one outputs a glyph that the other one matches.
+        """
+        (in_a, out_a), (in_b, out_b) = a, b
+        if not set(out_a).isdisjoint(in_b) or not set(out_b).isdisjoint(in_a):
+            return True
+        for shift in range(1 - len(in_b), len(in_a)):
+            if shift != 0 and all(in_a[i] == in_b[i - shift]
+                                  for i in range(max(0, shift), min(len(in_a), shift + len(in_b)))):
+                return True
+        return False
+
+    @classmethod
+    def pack_ligatures(cls, ligatures: List[Tuple[List[str], List[str]]]) -> List[List[Tuple[List[str], List[str]]]]:
+        """
+        Pack `ligatures` (highest priority first) into as few lookups as possible.
+
+        A ligature joins the last lookup unless it interacts with one of its ligatures (see `ligatures_interact(...)`).
+        So the lookup order is stable and the result is the same as with one lookup per ligature.
+        """
+        lookups: List[List[Tuple[List[str], List[str]]]] = []
+        for ligature in ligatures:
+            if len(lookups) == 0 or any(cls.ligatures_interact(ligature, other) for other in lookups[-1]):
+                lookups.append([])
+            lookups[-1].append(ligature)
+        return lookups
+
+    @staticmethod
+    def order_by_first_glyph(rules: Sequence[Tuple[Iterable[Any], Any]], weights: Optional[List[int]] = None) -> List[Any]:
+        """
+        Order the subtables of a lookup so that rules that start with the same glyph are next to each other.
+
+        Arguments:
+        rules -- `(FIRST_GLYPHS, RULE)` with the highest priority first. `FIRST_GLYPHS` are the glyphs the input of `RULE` can start with.
+        weights -- Optional weight of each rule. Groups with the highest total weight come first.
+
+        Only rules that can start at the same glyph compete at a position, so their relative order is kept.
+        """
+        weights = [0] * len(rules) if weights is None else weights
+        buckets: List[Tuple[set, List[Any], List[int]]] = []
+        for (first_glyphs, rule), weight in zip(rules, weights):
+            first_glyphs = set(first_glyphs)
+            matching = [bucket for bucket in buckets if not bucket[0].isdisjoint(first_glyphs)]
+            if len(matching) == 0:
+                buckets.append((first_glyphs, [rule], [weight]))
+                continue
+            # Merge all buckets the rule connects into the first one
+            glyphs, merged, merged_weights = matching[0]
+            for other in matching[1:]:
+                glyphs.update(other[0])
+                merged += other[1]
+                merged_weights += other[2]
+                buckets.remove(other)
+            glyphs.update(first_glyphs)
+            merged.append(rule)
+            merged_weights.append(weight)
+        # `sorted` is stable: without weights the order of the buckets is kept
+        buckets.sort(key=lambda bucket: -sum(bucket[2]))
+        return [rule for _, bucket, _ in buckets for rule in bucket]
+
+    def compile_macros(self, macros: List[Tuple[List[str], List[str]]]):
+        """
+        Compile the contextual ligatures of all `macros` into the lookup `self.macro_trie_lookup`.
+
+        The input sequences are put into a prefix trie. Macros that share everything but their last glyph
+        (e.g. `\\sub` and `\\sum`) or only in the argument of a macro (`\\mathbb{N}` and `\\mathbb{Z}`) become a single class based rule. Later definitions take precedence as in the non deferred mode.
+        The subtables are grouped by their marker glyph, so a glyph that starts no macro is rejected early.
+        With `macro_counts` the subtables of frequent macros come first.
+        """
+        # Only the latest definition of an input sequence is used
+        latest: Dict[Tuple[str, ...], int] = {}
+        for i, (char_in, _) in enumerate(macros):
+            latest[tuple(char_in)] = i
+        rules = [macros[i] for i in sorted(latest.values())]
+
+        root = _TrieNode()
+        for i, (char_in, _) in enumerate(rules):
+            node = root
+            for glyph in char_in:
+                node = node.children.setdefault(glyph, _TrieNode())
+            node.rule = i
+
+        # Sequences that no other rule is a prefix of do not depend on the rule order.
+        # Siblings that end in the same glyphs after the branching glyph are merged into a class based rule.
+        merged = set()
+        # Merged rules as `(PATH, SUFFIX, { BRANCHING_GLYPH: char_out })`, the input is `PATH + [BRANCHING_GLYPH] + SUFFIX`
+        groups: List[Tuple[List[str], List[str], Dict[str, List[str]]]] = []
+        stack: List[Tuple[_TrieNode, List[str]]] = [(root, [])]
+        while len(stack) > 0:
+            node, path = stack.pop()
+            branches: Dict[Tuple[str, ...], Dict[str, int]] = OrderedDict()
+            for glyph, child in node.children.items():
+                suffix = []
+                while child.rule is None and len(child.children) == 1:
+                    next_glyph, child = next(iter(child.children.items()))
+                    suffix.append(next_glyph)
+                if child.rule is not None and len(child.children) == 0:
+                    branches.setdefault(tuple(suffix), OrderedDict())[
+                        glyph] = child.rule
+            for suffix, leaves in branches.items():
+                if len(leaves) > 1:
+                    groups.append((
+                        path,
+                        list(suffix),
+                        OrderedDict((glyph, rules[rule][1]) for glyph, rule in leaves.items())
+                    ))
+                    merged.update(leaves.values())
+            for glyph, child in node.children.items():
+                if child.rule is None and len(child.children) > 0:
+                    stack.append((child, path + [glyph]))
+
+        # The latest definition has the highest priority. Merged rules do not compete with any other rule.
+        lookup = {
+            "lookup_name": self.macro_trie_lookup,
+            "lookup_feature": self.feature,
+            "lookup_after": self.macro_length_lookup
+        }
+        # Macros of the same length only compete if one input is a prefix of the other, so rules are grouped by
+        # their first two glyphs (the marker and the first letter) and these groups are ordered by frequency.
+        subtables: List[Tuple[Iterable[Tuple[str, ...]], Tuple[str, Any]]] = []
+        weights: List[int] = []
+        for i in reversed(range(len(rules))):
+            if i not in merged:
+                char_in, char_out = rules[i]
+                subtables.append(({tuple(char_in[:2])}, (char_in[0], functools.partial(
+                    self._add_in_group, self._rule_groups.get(tuple(char_in)),
+                    functools.partial(self.add_advanced_ligature, char_in, char_out, **lookup)))))
+                weights.append(self._macro_weights.get(tuple(char_in), 0))
+        for path, suffix, args in groups:
+            inputs = [path + [glyph] + suffix for glyph in args]
+            class_in: List[Optional[str]] = [*path, None, *suffix]
+            subtables.append(({tuple(i[:2]) for i in inputs}, (inputs[0][0], functools.partial(
+                self._add_in_group, self._rule_groups.get(tuple(inputs[0])),
+                functools.partial(self.add_class_ligature, class_in, len(path), args, **lookup)))))
+            weights.append(sum(self._macro_weights.get(tuple(i), 0) for i in inputs))
+
+        # The subtables of a marker glyph stay next to each other, the most frequent marker first
+        ordered = self.order_by_first_glyph(subtables, weights)
+        marker_weights: Dict[str, int] = {}
+        for (_, (marker, _)), weight in zip(subtables, weights):
+            marker_weights[marker] = marker_weights.get(marker, 0) + weight
+        marker_order = {marker: i for i, marker in reversed(list(enumerate(marker for marker, _ in ordered)))}
+        ordered.sort(key=lambda rule: (-marker_weights[rule[0]], marker_order[rule[0]]))
+
+        # New subtables are placed first: add them in reverse order
+        for _, add_subtable in reversed(ordered):
+            add_subtable()
+
+    def lookup_count(self) -> int:
+        """ Number of GSUB lookups in the font, including the lookups of the base font. Call `compile()` first. """
+        return len(self.font.gsub_lookups)
+
+    def features_text(self) -> str:
+        """ All lookups as feature file, the applied feature file after `apply_rule_set(...)`. """
+        if self._applied_features is not None:
+            return self._applied_features
+        return self.features.text(self.feature)
+
+    def rule_set(self) -> Dict[str, Any]:
+        """
+        The compiled rules as font independent data (plain JSON) for `apply_rule_set(...)`. Call `compile()` first.
+
+        Besides the feature file and the imported glyphs it contains the glyphs of the base font the rules refer to
+        and which of the relevant codepoints the base font has, as they decide between the base font and a fallback.
+        """
+        imported = set(name for name, _, _ in self.imported_glyphs)
+        base_glyphs = sorted(self.features.glyphs - imported - set(self.marker_glyphs))
+        base_index = self._read_codepoint_index(self.font)
+        codepoints = set(c for c, glyph_name in base_index.items() if glyph_name in self.features.glyphs)
+        for font_name in set(font_name for _, font_name, _ in self.imported_glyphs):
+            sources = set(source for _, source_font, source in self.imported_glyphs if source_font == font_name)
+            codepoints.update(c for c, glyph_name in self.codepoint_index(font_name).items() if glyph_name in sources)
+        return {
+            "features": self.features_text(),
+            "glyphs": [{"name": name, "font": font_name, "source": source}
+                       for name, font_name, source in self.imported_glyphs],
+            "markers": [{"name": marker, "reference": reference} for marker, reference in self.marker_glyphs.items()],
+            "base_glyphs": base_glyphs,
+            "codepoints": {str(c): base_index.get(c) for c in sorted(codepoints)}
+        }
+
+    def check_rule_set(self, rule_set: Dict[str, Any]) -> List[str]:
+        """ Reasons why `rule_set` does not give the same result as the definitions it was compiled from. Empty if it can be applied. """
+        problems = [f"Glyph `{glyph_name}` is missing" for glyph_name in rule_set["base_glyphs"] if glyph_name not in self.font]
+        base_index = self._read_codepoint_index(self.font)
+        for c, glyph_name in rule_set["codepoints"].items():
+            if base_index.get(int(c)) != glyph_name:
+                problems.append(f"U+{int(c):04X} is `{base_index.get(int(c))}` instead of `{glyph_name}`")
+        for glyph in rule_set["glyphs"]:
+            if glyph["font"] not in self.source_fonts:
+                problems.append(f"Unknown font `{glyph['font']}`")
+            elif glyph["name"] in self.font:
+                problems.append(f"Glyph `{glyph['name']}` already exists")
+        return problems
+
+    @_profiled("apply_rules")
+    def apply_rule_set(self, rule_set: Dict[str, Any]):
+        """
+        Import the glyphs of `rule_set` (see `rule_set()`) and use its feature file instead of recorded definitions.
+        Only for fonts without problems in `check_rule_set(...)`.
+        """
+        for glyph in rule_set["glyphs"]:
+            glyph_name, font_name, source_glyph = glyph["name"], glyph["font"], glyph["source"]
+            self._pending_imports.setdefault(font_name, []).append((glyph_name, source_glyph))
+            # Later `use_glyph(...)` calls (e.g. to set a width) find the imported glyph
+            names = self.useable_glyphs.setdefault(font_name, {"unicode": {}, "name": {}})
+            names["name"][source_glyph] = glyph_name
+        for font_name, names in self.useable_glyphs.items():
+            if font_name != "Default":
+                names["unicode"].update((chr(c), names["name"][source_glyph])
+                                        for c, source_glyph in self.codepoint_index(font_name).items()
+                                        if source_glyph in names["name"])
+        self.flush_imports()
+        for marker in rule_set["markers"]:
+            self.add_marker_glyph(marker["name"], marker["reference"])
+        self.apply_features(rule_set["features"])
+
+    def apply_features(self, text: str):
+        """ Add the lookups of the feature file `text` to the font. """
+        self._applied_features = text
+        fd, fea_file = tempfile.mkstemp(suffix=".fea")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            self.font.mergeFeature(fea_file)
+        finally:
+            os.remove(fea_file)
+
 Fonts = Optional[List[str]]
 
 class EditFont:
-    def __init__(self, font: str, *, other_fonts: Dict[str, str] = {}, in_folder: str = "input_files", out_folder: str = "output_files"):
+    def __init__(self, font: str, *, other_fonts: Dict[str, str] = {}, in_folder: str = "input_files", out_folder: str = "output_files", share_lookups: bool = False, deferred: bool = False, profile: bool = False, backend: Literal["fontforge", "fonttools", "plan"] = "fontforge", glyph_cache: Optional[str] = None, macro_counts: Optional[str] = None, min_macro_count: int = 0):
+        """
+        Open `font` from `in_folder` for editing. Glyphs that are missing in the font are taken from `other_fonts`.
+
+        Keyword arguments:
+        share_lookups -- Share the substitution lookups between ligatures. Results in far fewer lookups with the same shaping.
+        deferred -- Record all ligatures and macros and compile them together in `save()`.
+        profile -- Record timings and counters of the build. See `profile_report()`.
+        backend -- "fontforge" or "fonttools". The fontTools backend writes the GSUB table in one step from a feature file
+            and does not need FontForge (see `fonttools_backend.py`). It is always deferred and needs a TrueType base font.
+            "plan" is a dry run on top of fontTools that resolves all definitions without building the font, see `plan()`.
+        glyph_cache -- Folder of an on-disk cache of the source fonts (see `_GlyphCache`). A rebuild does not open
+            source fonts whose glyphs are all cached. Glyphs are then imported as outlines instead of by copy and paste.
+        macro_counts -- JSON file with the macro frequencies of a corpus (written by `corpus.py`). In deferred mode the
+            macro rules are ordered by frequency.
+        min_macro_count -- Leave out macros (and arguments of `add_macro_font`) that occur less often in `macro_counts`.
+        """
         self.in_folder = Path(in_folder)
         self.out_folder = Path(out_folder)
+        self.profiler = _Profiler(enabled=profile)
+        self._group_count = 0
+
+        if backend == "fonttools":
+            from fonttools_backend import FontToolsBackend, open_font
+            backend_class: Any = FontToolsBackend
+        elif backend == "plan":
+            from fonttools_backend import PlanBackend, open_font
+            backend_class = PlanBackend
+        elif backend == "fontforge":
+            if fontforge is None:
+                raise Exception("The FontForge python module is not available. Use `backend=\"fonttools\"`")
+            backend_class, open_font = _EditorBackend, fontforge.open
+        else:
+            raise Exception(f"Unknown backend `{backend}`")
+        self.backend_name = backend
+        self.font_file = font
+        self.other_fonts: Dict[str, str] = OrderedDict(other_fonts)
+
+        with self.profiler.phase("open_fonts"):
+            self.font = open_font((self.in_folder / font).as_posix())
+        self.profiler.count("fonts_opened")
+        # Source fonts are opened when first needed. Imported glyphs are scaled to the em size of `font`.
+        _other_fonts = _SourceFonts(OrderedDict(
+            (k, (self.in_folder / v).as_posix()) for k, v in other_fonts.items()), self.profiler, open_font)
+        _glyph_cache = None if glyph_cache is None else _GlyphCache(
+            glyph_cache, _other_fonts.paths, self.profiler)
+
+        self.backend = backend_class(
+            self.font, _other_fonts, share_lookups=share_lookups, deferred=deferred, profiler=self.profiler, glyph_cache=_glyph_cache)
+
+        self.min_macro_count = min_macro_count
+        self.macro_counts: Optional[Dict[str, int]] = None
+        if macro_counts is not None:
+            with open(macro_counts, "r", encoding="utf-8") as f:
+                self.macro_counts = json.load(f)["counts"]
+            self.backend.macro_counts = self.macro_counts
+
+    def _is_rare(self, key: str) -> bool:
+        """ Whether the macro `key` is left out because it occurs less than `min_macro_count` times in the corpus. """
+        if self.macro_counts is None or self.macro_counts.get(key, 0) >= self.min_macro_count:
+            return False
+        self.profiler.count("macros_dropped")
+        return True
+
+    @contextmanager
+    def _group(self, method: str, group: Optional[str] = None):
+        """
+        Profiler and size report group for one call of a definition method: `group` if given, else e.g. `add_macros#3`.
+        Nested calls belong to the outer group.
+        """
+        if self.backend.group is not None:
+            yield
+            return
+        self._group_count += 1
+        name = f"{method}#{self._group_count}" if group is None else group
+        with self.profiler.group(name), self.backend.definition_group(name):
+            yield
+
+    def profile_report(self) -> Dict[str, Any]:
+        """ Timings and counters recorded with `profile=True` as JSON serializable dict. """
+        return self.profiler.report()
+
+    def write_profile(self, file_name: str):
+        """ Write `profile_report()` as JSON to `file_name`. """
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(self.profile_report(), f, indent=4)
+
+    def plan(self) -> Dict[str, Any]:
+        """
+        Report of a dry run with `backend="plan"`: the glyphs that would be imported and from which font, the number
+        of lookups and rules, the glyphs that were not found and conflicting macros (see `PlanBackend.plan()`).
+        Source fonts are read for their codepoint index and the outlines of the used glyphs, which decide which glyphs
+        are the same (see `_EditorBackend._source_content_key`). With a filled `glyph_cache` they are not opened at all.
+        """
+        if self.backend_name != "plan":
+            raise Exception("`plan()` needs `backend=\"plan\"`")
+        return self.backend.plan()
+
+    def release_source_fonts(self, fonts: Optional[List[str]] = None):
+        """
+        Import the glyphs used so far and close the source `fonts` (default: all) to free their memory.
+        Call it once the remaining definitions take no more glyphs from them. `save()` releases all source fonts.
+        """
+        with self.profiler.phase("release_fonts"):
+            self.backend.release_source_fonts(fonts)
+
+    def close(self):
+        """ Close the font and all source fonts. The `EditFont` can not be used afterwards. """
+        self.backend.release_source_fonts()
+        self.font.close()
+
+    def rule_set(self) -> Dict[str, Any]:
+        """
+        Compile all definitions into rules that can be applied to other fonts of the same family with `apply_rule_set(...)`.
+        The result is plain JSON data.
+        """
+        self.backend.compile()
+        return self.backend.rule_set()
+
+    def check_rule_set(self, rule_set: Dict[str, Any]) -> List[str]:
+        """
+        Reasons why `rule_set` can not be applied to this font, e.g. glyphs that have other names than in the font
+        it was compiled from or that this font has while they were taken from a fallback font. Empty if it can be applied.
+        """
+        return self.backend.check_rule_set(rule_set)
+
+    def apply_rule_set(self, rule_set: Dict[str, Any]):
+        """
+        Apply the rules compiled from another font of the same family (see `rule_set()`) instead of adding all definitions again.
+        Only the glyphs are imported into this font. Glyph widths still have to be set.
+        """
+        problems = self.check_rule_set(rule_set)
+        if len(problems) > 0:
+            raise Exception(f"The rule set can not be applied to `{self.font_file}`: " + "; ".join(problems))
+        self.backend.apply_rule_set(rule_set)
 
-        self.font = fontforge.open((self.in_folder / font).as_posix())
-        _other_fonts = OrderedDict()
-        for k, v in other_fonts.items():
-            _other_fonts[k] = fontforge.open((self.in_folder / v).as_posix())
-            _other_fonts[k].em = self.font.em
+    def export_features(self, fea_file: str, *, imports_file: Optional[str] = None):
+        """
+        Write all ligature and macro lookups as OpenType feature file to `fea_file`. Recorded definitions are compiled first.
 
-        self.backend = _EditorBackend(self.font, _other_fonts)
+        Keyword arguments:
+        imports_file -- Also write the glyphs the rules need as JSON: the glyphs copied from `other_fonts`
+            and the marker glyphs (composites of the backslash, the braces or a script prefix).
+        """
+        self.backend.compile()
+        with open(fea_file, "w", encoding="utf-8") as f:
+            f.write(self.backend.features_text())
+        if imports_file is None:
+            return
+        imports = {
+            "font": self.font_file,
+            "other_fonts": self.other_fonts,
+            "glyphs": [{"name": name, "font": font_name, "source": source}
+                       for name, font_name, source in self.backend.imported_glyphs],
+            "markers": [{"name": name, "reference": reference}
+                        for name, reference in self.backend.marker_glyphs.items()]
+        }
+        with open(imports_file, "w", encoding="utf-8") as f:
+            json.dump(imports, f, indent=4, ensure_ascii=False)
 
     def add_ligature(
         self, characters: str, ligature: str, *,
         fonts: Optional[List[str]] = None,
         char_format: Glyph_Format = "unicode",
-        repl_format: Glyph_Format = "unicode"
+        repl_format: Glyph_Format = "unicode",
+        group: Optional[str] = None
     ):
         """
-        Add a Ligature to the font.
+        Add a Ligature to the font. `group` names the definition in the profile and the size report (see `save(...)`).
         """
-        self.backend.add_advanced_ligature(
-            self.backend.use_glyph_format(
-                characters, fonts=["Default"], format=char_format),
-            self.backend.use_glyph_format(
-                ligature, fonts=fonts, format=repl_format),
-            lookup_feature=self.backend.feature
-        )
+        with self._group("add_ligature", group):
+            self.backend.add_ligature(
+                self.backend.use_glyph_format(
+                    characters, fonts=["Default"], format=char_format),
+                self.backend.use_glyph_format(
+                    ligature, fonts=fonts, format=repl_format)
+            )
+
+    def glyph(self, glyph: str, *, fonts: Optional[List[str]] = None, format: Literal["unicode", "name"] = "unicode"):
+        """
+        Returns the fontforge glyph for `glyph` (see `_EditorBackend.use_glyph(...)`). The glyph is added if nessesary.
+        """
+        glyph_name = self.backend.use_glyph(glyph, fonts=fonts, format=format)
+        self.backend.flush_imports()
+        if self.backend_name == "plan" and glyph_name not in self.font:
+            # Planned glyphs are not imported
+            return SimpleNamespace(glyphname=glyph_name, width=0)
+        return self.font[glyph_name]
 
     def add_ligatures(
         self, ligatures: dict, *,
@@ -411,17 +1910,57 @@ class EditFont:
         lig_suffix="",
         fonts: Optional[List[str]] = None,
         char_format: Glyph_Format = "unicode",
-        repl_format: Glyph_Format = "unicode"
+        repl_format: Glyph_Format = "unicode",
+        group: Optional[str] = None
+    ):
+        with self._group("add_ligatures", group):
+            for characters, ligature in ligatures.items():
+                self.add_ligature(char_prefix + characters + char_suffix, lig_prefix + ligature +
+                                  lig_suffix, fonts=fonts, char_format=char_format, repl_format=repl_format)
+
+    def add_scripts(
+        self,
+        prefix: str,
+        map: Dict[str, str], *,
+        unbraced: Optional[str] = None,
+        max_length: int = 8,
+        fonts: Optional[List[str]] = None,
+        repl_format: Glyph_Format = "unicode",
+        group: Optional[str] = None
     ):
-        for characters, ligature in ligatures.items():
-            self.add_ligature(char_prefix + characters + char_suffix, lig_prefix + ligature +
-                              lig_suffix, fonts=fonts, char_format=char_format, repl_format=repl_format)
+        """
+        Add superscripts or subscripts: `prefix + "{" + ARGS + "}"` is replaced by the replacements of ARGS in `map`,
+        for any combination of up to `max_length` characters. Example: `add_scripts("^", {"1": "¹", "2": "²"})`
+        replaces `^{12}`, `^{2}` and `^12`.
+
+        map -- A dictionary of characters mapped to their replacement (a single glyph).
+
+        Keyword arguments:
+        unbraced -- The characters of `map` that are also replaced without braces, as long as they follow each other.
+            Defaults to all characters. Use `""` for letters, so that `snake_case` stays as it is.
+        max_length -- The longest argument in braces.
+        fonts, repl_format, group -- See `add_macros(...)`.
+        """
+        with self._group("add_scripts", group):
+            args = OrderedDict()
+            for character, replacement in map.items():
+                replacement_glyphs = self.backend.use_glyph_format(replacement, fonts=fonts, format=repl_format)
+                if len(replacement_glyphs) != 1:
+                    raise Exception(f"The replacement `{replacement}` of `{character}` is not a single glyph")
+                args[self.backend.use_glyph(character, fonts=["Default"])] = replacement_glyphs[0]
+            unbraced = "".join(map) if unbraced is None else unbraced
+            self.backend.add_scripts(
+                self.backend.use_glyph(prefix, fonts=["Default"]),
+                args,
+                unbraced=[self.backend.use_glyph(c, fonts=["Default"]) for c in unbraced],
+                max_length=max_length
+            )
 
-    def add_macro(self, macro: str, replacement: str, *, fonts: Optional[List[str]] = None, repl_format: Glyph_Format = "unicode"):
+    def add_macro(self, macro: str, replacement: str, *, fonts: Optional[List[str]] = None, repl_format: Glyph_Format = "unicode", group: Optional[str] = None):
         """
-        Add a single new macro. This is a short form for `add_macros({macro: replacement}, fonts=fonts, repl_format=repl_format)`.
+        Add a single new macro. This is a short form for `add_macros({macro: replacement}, fonts=fonts, repl_format=repl_format, group=group)`.
         """
-        self.add_macros({macro: replacement}, fonts=fonts, repl_format=repl_format)
+        self.add_macros({macro: replacement}, fonts=fonts, repl_format=repl_format, group=group)
 
     def add_macros(
         self,
@@ -431,7 +1970,8 @@ class EditFont:
         repl_prefix="",
         repl_suffix="",
         fonts: Union[Fonts, Tuple[Fonts,Fonts,Fonts]] = None,
-        repl_format: Union[Glyph_Format, Tuple[Glyph_Format,Glyph_Format,Glyph_Format]] = "unicode"
+        repl_format: Union[Glyph_Format, Tuple[Glyph_Format,Glyph_Format,Glyph_Format]] = "unicode",
+        group: Optional[str] = None
     ):
         """
         Add multiple macros to the font. The macros are passed as dictionary entries `{ macro: replacement }`.
@@ -441,6 +1981,8 @@ class EditFont:
         Keyword Arguments:
             fonts -- Either None (default), a **List** of font names or a **touple** of lists of fonts names (for prefix, replacement, suffix)
             repl_format -- The format used. When passed as tuple different formats for `(prefix_fmt, replacement_fmt, suffix_fmt)`.
+            group -- Name of the definition in the profile and in the size report of `save(...)`, e.g. "greek-bold".
+                Defaults to the method and a running number, e.g. `add_macros#3`.
         
         Formatting: The glyph format is either "unicode" or "advanced".
             "unicode" -- A string is parsed as the given characters. 
@@ -449,22 +1991,25 @@ class EditFont:
                 The font names are specified in the constructor.
             ( Example: `glyphs = "a*Default b*Bold c*Italic"` with `{"Bold": ..., "Italic": ...}` passed as `other_fonts` in the constructor. )
         """
-        # Make everything tuple
-        if not isinstance(repl_format, Tuple):
-            repl_format = (repl_format, repl_format, repl_format)
-        if not isinstance(fonts, Tuple):
-            fonts = (fonts,fonts,fonts)
+        with self._group("add_macros", group):
+            # Make everything tuple
+            if not isinstance(repl_format, Tuple):
+                repl_format = (repl_format, repl_format, repl_format)
+            if not isinstance(fonts, Tuple):
+                fonts = (fonts,fonts,fonts)
         
-        repl_prefix_glyps = self.backend.use_glyph_format(repl_prefix, fonts=fonts[0], format=repl_format[0])
-        repl_suffix_glyphs = self.backend.use_glyph_format(repl_suffix, fonts=fonts[2], format=repl_format[2])
+            repl_prefix_glyps = self.backend.use_glyph_format(repl_prefix, fonts=fonts[0], format=repl_format[0])
+            repl_suffix_glyphs = self.backend.use_glyph_format(repl_suffix, fonts=fonts[2], format=repl_format[2])
 
-        for macro, replacement in macros.items():
-            repl_glyphs = self.backend.use_glyph_format(replacement, fonts=fonts[1], format=repl_format[1])
+            for macro, replacement in macros.items():
+                if self._is_rare(macro_prefix + macro + macro_suffix):
+                    continue
+                repl_glyphs = self.backend.use_glyph_format(replacement, fonts=fonts[1], format=repl_format[1])
 
-            self.backend.add_macro(
-                macro_prefix + macro + macro_suffix,
-                repl_prefix_glyps+repl_glyphs+repl_suffix_glyphs
-            )
+                self.backend.add_macro(
+                    macro_prefix + macro + macro_suffix,
+                    repl_prefix_glyps+repl_glyphs+repl_suffix_glyphs
+                )
 
     def add_macro_font(
             self, 
@@ -473,7 +2018,8 @@ class EditFont:
             repl_prefix="", 
             repl_suffix="", 
             repl_format: Union[Glyph_Format, Tuple[Glyph_Format,Glyph_Format,Glyph_Format]] = "unicode",
-            fonts: Union[Fonts, Tuple[Fonts,Fonts,Fonts]] = None
+            fonts: Union[Fonts, Tuple[Fonts,Fonts,Fonts]] = None,
+            group: Optional[str] = None
         ):
         """
         Adds a single macro that accepts a single argument. Examples for this would be `\\mathbb` or `\\mathcal`.
@@ -484,28 +2030,71 @@ class EditFont:
 
         Keyword arguments: See `add_macros(...)`.
         """
-        # Make everything tuple
-        if not isinstance(repl_format, Tuple):
-            repl_format = (repl_format, repl_format, repl_format)
-        if not isinstance(fonts, Tuple):
-            fonts = (fonts,fonts,fonts)
+        with self._group("add_macro_font", group):
+            if self._is_rare(macro):
+                return
+            map = {k: v for k, v in map.items() if not self._is_rare(argument_key(macro, k))}
+            if len(map) == 0:
+                return
+            # Make everything tuple
+            if not isinstance(repl_format, Tuple):
+                repl_format = (repl_format, repl_format, repl_format)
+            if not isinstance(fonts, Tuple):
+                fonts = (fonts,fonts,fonts)
         
-        repl_prefix_glyps = self.backend.use_glyph_format(repl_prefix, fonts=fonts[0], format=repl_format[0])
-        repl_suffix_glyphs = self.backend.use_glyph_format(repl_suffix, fonts=fonts[2], format=repl_format[2])
+            repl_prefix_glyps = self.backend.use_glyph_format(repl_prefix, fonts=fonts[0], format=repl_format[0])
+            repl_suffix_glyphs = self.backend.use_glyph_format(repl_suffix, fonts=fonts[2], format=repl_format[2])
 
-        parsed_map = {}
-        for k, v in map.items():
-            parsed_map[k] = repl_prefix_glyps+self.backend.use_glyph_format(v, fonts=fonts[1], format=repl_format[1])+repl_suffix_glyphs
-        self.backend.add_macro_font(macro, parsed_map)
+            parsed_map = {}
+            for k, v in map.items():
+                parsed_map[k] = repl_prefix_glyps+self.backend.use_glyph_format(v, fonts=fonts[1], format=repl_format[1])+repl_suffix_glyphs
+            self.backend.add_macro_font(macro, parsed_map)
 
-    def save(self, camel_name: str, *, file_name: Optional[str] = None, add_copyright: Optional[str] = None):
+    def save(
+        self,
+        camel_name: str, *,
+        file_name: Optional[str] = None,
+        add_copyright: Optional[str] = None,
+        formats: Optional[List[str]] = None,
+        prune: bool = False,
+        jobs: Optional[int] = None,
+        size_report: Optional[str] = None,
+        draft: bool = False
+    ) -> List[Path]:
         """
         Save the font with new name `camel_case` into the file `camel_case+".ttf"` or inside `file_name` if specified.
+
+        Keyword arguments:
+        formats -- File extensions to generate, e.g. `["ttf", "otf", "woff2", "sfd"]`. Each format is written next to `file_name`
+            with the extension replaced. Defaults to the extension of `file_name`.
+        prune -- Remove glyphs that can not be displayed before saving (see `_EditorBackend.prune_glyphs()`).
+        jobs -- Number of worker processes that write several formats in parallel (defaults to one per format).
+            With `jobs=1` all formats are written by this process.
+        size_report -- Write the bytes that each definition group adds to the GSUB and glyf/CFF tables as JSON to this file
+            (see `sizes.py`, needs fontTools). Groups are named with the `group` argument of the definition methods.
+        draft -- Fast build for iteration: only the first file is written (e.g. put "ttf" or "sfd" first in `formats`),
+            without hints and TrueType instructions (`DRAFT_FLAGS`) and in this process. The skipped files are printed.
+            Not meant for releases.
+
+        Every file is written to a temporary file inside `out_folder` first and renamed when it is complete.
+        Returns the paths of the generated files.
         """
+        if self.backend_name == "plan":
+            raise Exception("A font with `backend=\"plan\"` can not be saved, see `plan()`")
+        self.backend.compile()
+        if self.backend.glyph_cache is not None:
+            self.backend.glyph_cache.write()
+        # All glyphs are imported: the source fonts are not needed while the font is generated
+        self.release_source_fonts()
+        if prune:
+            self.backend.prune_glyphs()
+
         # Change font details
         name_with_space = split_camel_case(camel_name)
         if file_name is None:
             file_name = f"{camel_name}.ttf"
+        file_names = [file_name] if formats is None else [
+            Path(file_name).with_suffix("." + fmt).as_posix() for fmt in formats]
 
         self.font.fontname = camel_name
         self.font.fullname = name_with_space
@@ -516,12 +2105,45 @@ class EditFont:
         self.font.sfnt_names = tuple((row[0], 'UniqueID', name_with_space)
                                      if row[1] == 'UniqueID' else row for row in self.font.sfnt_names)
 
-        # Generate font & move to output directory
-        output_full_path = self.out_folder / file_name
-        self.font.generate(file_name)
-        os.rename(file_name, output_full_path)
-        print(
-            f"Generated ligaturized font {name_with_space} in {output_full_path.as_posix()}")
-
+        outputs = [self.out_folder / file_name for file_name in file_names]
+        if draft and len(outputs) > 1:
+            print(f"Draft build: skipped {', '.join(output.name for output in outputs[1:])}")
+            outputs = outputs[:1]
+        with self.profiler.phase("generate"):
+            # The formats of the fontTools backend are only serializations of the same tables
+            if len(outputs) == 1 or jobs == 1 or self.backend_name == "fonttools":
+                for output in outputs:
+                    generate_atomic(self.font, output, DRAFT_FLAGS if draft else ())
+            else:
+                # Save the built font once, the workers only convert it
+                temp_folder = tempfile.mkdtemp(dir=self.out_folder, prefix=f".{camel_name}.")
+                try:
+                    sfd_file = os.path.join(temp_folder, f"{camel_name}.sfd")
+                    self.font.save(sfd_file)
+                    with ProcessPoolExecutor(max_workers=jobs or len(outputs)) as executor:
+                        futures = [executor.submit(_generate_from_sfd, sfd_file, output.as_posix())
+                                   for output in outputs]
+                        for future in futures:
+                            future.result()
+                finally:
+                    shutil.rmtree(temp_folder, ignore_errors=True)
+        for output in outputs:
+            print(
+                f"Generated ligaturized font {name_with_space} in {output.as_posix()}")
+        if size_report is not None:
+            self.write_size_report(size_report, outputs)
+        return outputs
+
+    def write_size_report(self, file_name: str, outputs: List[Path]):
+        """ Write the size report of the first generated font in `outputs` that fontTools can read (see `save(...)`). """
+        from sizes import group_sizes
+
+        readable = [output for output in outputs if output.suffix in (".ttf", ".otf", ".woff", ".woff2")]
+        if len(readable) == 0:
+            raise Exception("The size report needs a ttf, otf, woff or woff2 output")
+        with self.profiler.phase("size_report"):
+            report = group_sizes(readable[0].as_posix(), self.backend.features, self.backend.glyph_groups)
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
 
 LETTERS = tuple('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+"""
+A small GSUB interpreter to check what a generated font does with a piece of LaTeX.
+
+    $ python shaping.py output_files/Test.ttf "\\alpha + \\balpha"
+    $ python shaping.py output_files/Test.ttf --file paper.tex
+
+Only the glyph substitutions (GSUB) are simulated. The number of lookups and subtables visited
+is counted as a measure for the shaping cost in an editor.
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from fontTools.ttLib import TTFont
+
+# Lookup flags
+IGNORE_BASE_GLYPHS = 0x2
+IGNORE_LIGATURES = 0x4
+IGNORE_MARKS = 0x8
+MARK_ATTACHMENT_TYPE = 0xFF00
+
+
+class ShapeResult:
+    """ Glyph sequence of a shaped string together with the visited lookups and subtables. """
+
+    def __init__(self, text: str, glyphs: List[str], lookups_visited: int, subtables_visited: int):
+        self.text = text
+        self.glyphs = glyphs
+        self.lookups_visited = lookups_visited
+        self.subtables_visited = subtables_visited
+
+    def per_glyph(self) -> Dict[str, float]:
+        """ Lookups and subtables visited per input glyph. """
+        count = max(len(self.text), 1)
+        return {
+            "lookups": self.lookups_visited / count,
+            "subtables": self.subtables_visited / count
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "text": self.text,
+            "glyphs": self.glyphs,
+            "lookups_visited": self.lookups_visited,
+            "subtables_visited": self.subtables_visited,
+            "per_glyph": self.per_glyph()
+        }
+
+
+class Shaper:
+    """
+    Shapes strings with the GSUB table of a font.
+
+    Keyword arguments:
+    features -- The features to apply (the fonts built by `ligaturize.py` only use "calt").
+    script, language -- The script and language system. Fall back to "DFLT" and the default language.
+    """
+
+    def __init__(self, font_file: str, *, features: Sequence[str] = ("calt",), script: str = "DFLT", language: Optional[str] = None):
+        self.font = TTFont(font_file, lazy=False)
+        self.cmap: Dict[int, str] = self.font.getBestCmap() or {}
+        self.gsub = self.font["GSUB"].table if "GSUB" in self.font else None
+        self.lookups: List[Any] = [] if self.gsub is None else self.gsub.LookupList.Lookup
+
+        self.glyph_classes: Dict[str, int] = {}
+        self.mark_classes: Dict[str, int] = {}
+        if "GDEF" in self.font:
+            gdef = self.font["GDEF"].table
+            if gdef.GlyphClassDef is not None:
+                self.glyph_classes = gdef.GlyphClassDef.classDefs
+            if getattr(gdef, "MarkAttachClassDef", None) is not None:
+                self.mark_classes = gdef.MarkAttachClassDef.classDefs
+
+        self.lookup_indices = self._feature_lookups(features, script, language)
+        self._coverage_cache: Dict[int, Dict[str, int]] = {}
+
+    # ## Setup ##
+    def _feature_lookups(self, features: Sequence[str], script: str, language: Optional[str]) -> List[int]:
+        """ Indices of the lookups of `features` in the order they are applied. """
+        if self.gsub is None:
+            return []
+        scripts = {record.ScriptTag: record.Script for record in self.gsub.ScriptList.ScriptRecord}
+        script_table = scripts.get(script) or scripts.get("DFLT")
+        if script_table is None:
+            return []
+        lang_sys = script_table.DefaultLangSys
+        for record in script_table.LangSysRecord:
+            if record.LangSysTag == language:
+                lang_sys = record.LangSys
+        if lang_sys is None:
+            return []
+
+        feature_records = self.gsub.FeatureList.FeatureRecord
+        lookups = set()
+        if lang_sys.ReqFeatureIndex != 0xFFFF:
+            lookups.update(feature_records[lang_sys.ReqFeatureIndex].Feature.LookupListIndex)
+        # Like HarfBuzz only the first feature with a tag is applied, a second one is ignored
+        found = set()
+        for index in lang_sys.FeatureIndex:
+            tag = feature_records[index].FeatureTag
+            if tag in features and tag not in found:
+                found.add(tag)
+                lookups.update(feature_records[index].Feature.LookupListIndex)
+        return sorted(lookups)
+
+    def _coverage(self, coverage) -> Dict[str, int]:
+        """ `{ GLYPH: COVERAGE_INDEX }` of a coverage table (cached). """
+        key = id(coverage)
+        if key not in self._coverage_cache:
+            self._coverage_cache[key] = {glyph: i for i, glyph in enumerate(coverage.glyphs)}
+        return self._coverage_cache[key]
+
+    # ## Shaping ##
+    def glyphs_for_text(self, text: str) -> List[str]:
+        """ The glyphs of `text` before any substitution. """
+        return [self.cmap.get(ord(c), ".notdef") for c in text]
+
+    def shape(self, text: str) -> ShapeResult:
+        """ Shape `text` and count the visited lookups and subtables. """
+        self._lookups_visited = 0
+        self._subtables_visited = 0
+        buffer = self.glyphs_for_text(text)
+        for lookup_index in self.lookup_indices:
+            lookup = self.lookups[lookup_index]
+            if lookup.LookupType == 8 or self._extension_type(lookup) == 8:
+                self._apply_reverse(lookup, buffer)
+                continue
+            i = 0
+            while i < len(buffer):
+                end = self._apply_lookup(lookup, buffer, i)
+                i = i + 1 if end is None else max(end, i + 1)
+        return ShapeResult(text, buffer, self._lookups_visited, self._subtables_visited)
+
+    def shaping_cost(self, lines: Sequence[str]) -> List[Dict[str, Any]]:
+        """ Shaping cost of every line in `lines`. """
+        costs = []
+        for line in lines:
+            result = self.shape(line)
+            costs.append({
+                "length": len(line),
+                "lookups_visited": result.lookups_visited,
+                "subtables_visited": result.subtables_visited
+            })
+        return costs
+
+    def _ignored(self, glyph: str, flag: int) -> bool:
+        glyph_class = self.glyph_classes.get(glyph, 0)
+        if glyph_class == 1 and flag & IGNORE_BASE_GLYPHS:
+            return True
+        if glyph_class == 2 and flag & IGNORE_LIGATURES:
+            return True
+        if glyph_class == 3:
+            if flag & IGNORE_MARKS:
+                return True
+            mark_type = (flag & MARK_ATTACHMENT_TYPE) >> 8
+            if mark_type != 0 and self.mark_classes.get(glyph, 0) != mark_type:
+                return True
+        return False
+
+    def _next(self, buffer: List[str], i: int, flag: int, step: int = 1) -> int:
+        """ Next position after `i` in direction `step` that is not ignored by the lookup flag (or out of range). """
+        i += step
+        while 0 <= i < len(buffer) and self._ignored(buffer[i], flag):
+            i += step
+        return i
+
+    def _match(self, buffer: List[str], start: int, count: int, flag: int, step: int = 1) -> Optional[List[int]]:
+        """ `count` positions starting at `start` (inclusive) in direction `step`, or `None` if the buffer ends before. """
+        positions = []
+        i = start
+        while len(positions) < count:
+            if not 0 <= i < len(buffer):
+                return None
+            positions.append(i)
+            i = self._next(buffer, i, flag, step)
+        return positions
+
+    @staticmethod
+    def _extension_type(lookup) -> int:
+        if lookup.LookupType == 7 and len(lookup.SubTable) > 0:
+            return lookup.SubTable[0].ExtensionLookupType
+        return lookup.LookupType
+
+    def _apply_lookup(self, lookup, buffer: List[str], i: int) -> Optional[int]:
+        """
+        Apply the first matching subtable of `lookup` at position `i`.
+        Returns the position after the substituted glyphs or `None` if no subtable matched.
+        """
+        self._lookups_visited += 1
+        if self._ignored(buffer[i], lookup.LookupFlag):
+            return None
+        for subtable in lookup.SubTable:
+            lookup_type = lookup.LookupType
+            if lookup_type == 7:
+                lookup_type = subtable.ExtensionLookupType
+                subtable = subtable.ExtSubTable
+            self._subtables_visited += 1
+            end = self._apply_subtable(lookup_type, subtable, buffer, i, lookup.LookupFlag)
+            if end is not None:
+                return end
+        return None
+
+    def _apply_subtable(self, lookup_type: int, subtable, buffer: List[str], i: int, flag: int) -> Optional[int]:
+        glyph = buffer[i]
+        if lookup_type == 1:
+            if glyph in subtable.mapping:
+                buffer[i] = subtable.mapping[glyph]
+                return i + 1
+        elif lookup_type == 2:
+            if glyph in subtable.mapping:
+                buffer[i:i + 1] = subtable.mapping[glyph]
+                return i + len(subtable.mapping[glyph])
+        elif lookup_type == 3:
+            if glyph in subtable.alternates:
+                buffer[i] = subtable.alternates[glyph][0]
+                return i + 1
+        elif lookup_type == 4:
+            for ligature in subtable.ligatures.get(glyph, []):
+                positions = self._match(buffer, i, len(ligature.Component) + 1, flag)
+                if positions is None:
+                    continue
+                if all(buffer[p] == c for p, c in zip(positions[1:], ligature.Component)):
+                    for p in reversed(positions[1:]):
+                        del buffer[p]
+                    buffer[i] = ligature.LigGlyph
+                    return i + 1
+        elif lookup_type in (5, 6):
+            return self._apply_context(lookup_type, subtable, buffer, i, flag)
+        return None
+
+    # ## Contextual lookups ##
+    def _context_rules(self, lookup_type: int, subtable, buffer: List[str], i: int):
+        """
+        Candidate rules of a (chaining) contextual subtable at position `i`.
+        Yields `(backtrack, input, lookahead, substitutions, matches)` where `matches(glyph, position, value)`
+        checks a glyph against a rule entry of the sequence `position` ("backtrack", "input" or "lookahead").
+        """
+        glyph = buffer[i]
+        chain = lookup_type == 6
+        if subtable.Format == 1:
+            coverage = self._coverage(subtable.Coverage)
+            if glyph not in coverage:
+                return
+            rule_sets = subtable.ChainSubRuleSet if chain else subtable.SubRuleSet
+            rule_set = rule_sets[coverage[glyph]]
+            if rule_set is None:
+                return
+            def matches_glyph(g, _, value): return g == value
+            for rule in (rule_set.ChainSubRule if chain else rule_set.SubRule):
+                yield ((rule.Backtrack if chain else []), [glyph] + list(rule.Input),
+                       (rule.LookAhead if chain else []), rule.SubstLookupRecord, matches_glyph)
+        elif subtable.Format == 2:
+            if glyph not in self._coverage(subtable.Coverage):
+                return
+            if chain:
+                class_defs = {
+                    "backtrack": subtable.BacktrackClassDef.classDefs if subtable.BacktrackClassDef else {},
+                    "input": subtable.InputClassDef.classDefs if subtable.InputClassDef else {},
+                    "lookahead": subtable.LookAheadClassDef.classDefs if subtable.LookAheadClassDef else {}
+                }
+            else:
+                input_classes = subtable.ClassDef.classDefs if subtable.ClassDef else {}
+                class_defs = {"backtrack": {}, "input": input_classes, "lookahead": {}}
+            first_class = class_defs["input"].get(glyph, 0)
+            class_sets = subtable.ChainSubClassSet if chain else subtable.SubClassSet
+            if first_class >= len(class_sets) or class_sets[first_class] is None:
+                return
+            class_set = class_sets[first_class]
+            def matches_class(g, position, value): return class_defs[position].get(g, 0) == value
+            for rule in (class_set.ChainSubClassRule if chain else class_set.SubClassRule):
+                yield ((rule.Backtrack if chain else []), [first_class] + list(rule.Input if chain else rule.Class),
+                       (rule.LookAhead if chain else []), rule.SubstLookupRecord, matches_class)
+        elif subtable.Format == 3:
+            def matches_coverage(g, _, coverage): return g in self._coverage(coverage)
+            input_coverage = subtable.InputCoverage if chain else subtable.Coverage
+            if glyph not in self._coverage(input_coverage[0]):
+                return
+            yield ((subtable.BacktrackCoverage if chain else []), input_coverage,
+                   (subtable.LookAheadCoverage if chain else []), subtable.SubstLookupRecord, matches_coverage)
+
+    def _apply_context(self, lookup_type: int, subtable, buffer: List[str], i: int, flag: int) -> Optional[int]:
+        for backtrack, input, lookahead, substitutions, matches in self._context_rules(lookup_type, subtable, buffer, i):
+            positions = self._match(buffer, i, len(input), flag)
+            if positions is None or not all(matches(buffer[p], "input", v) for p, v in zip(positions, input)):
+                continue
+            if len(backtrack) > 0:
+                before = self._match(buffer, self._next(buffer, i, flag, -1), len(backtrack), flag, -1)
+                if before is None or not all(matches(buffer[p], "backtrack", v) for p, v in zip(before, backtrack)):
+                    continue
+            if len(lookahead) > 0:
+                after = self._match(buffer, self._next(buffer, positions[-1], flag), len(lookahead), flag)
+                if after is None or not all(matches(buffer[p], "lookahead", v) for p, v in zip(after, lookahead)):
+                    continue
+            return self._apply_substitutions(buffer, positions, substitutions)
+        return None
+
+    def _apply_substitutions(self, buffer: List[str], positions: List[int], substitutions) -> int:
+        """ Apply the nested lookups of a matched contextual rule. Returns the position after the input sequence. """
+        end = positions[-1] + 1
+        for record in sorted(substitutions, key=lambda r: r.SequenceIndex):
+            if record.SequenceIndex >= len(positions):
+                continue
+            position = positions[record.SequenceIndex]
+            length = len(buffer)
+            nested = self.lookups[record.LookupListIndex]
+            nested_end = self._apply_lookup(nested, buffer, position)
+            if nested_end is None:
+                continue
+            # Ligatures and multiple substitutions move the glyphs after `position`
+            delta = len(buffer) - length
+            if delta != 0:
+                consumed = position + max(-delta, 0)
+                positions = [p if p <= position else p + delta for p in positions if p <= position or p > consumed]
+                end += delta
+        return end
+
+    def _apply_reverse(self, lookup, buffer: List[str]):
+        """ Reverse chaining single substitution: applied from the end of the buffer. """
+        for i in reversed(range(len(buffer))):
+            self._lookups_visited += 1
+            for subtable in lookup.SubTable:
+                if lookup.LookupType == 7:
+                    subtable = subtable.ExtSubTable
+                self._subtables_visited += 1
+                coverage = self._coverage(subtable.Coverage)
+                if buffer[i] not in coverage:
+                    continue
+                flag = lookup.LookupFlag
+                before = self._match(buffer, self._next(buffer, i, flag, -1),
+                                     len(subtable.BacktrackCoverage), flag, -1)
+                after = self._match(buffer, self._next(buffer, i, flag),
+                                    len(subtable.LookAheadCoverage), flag)
+                if before is None or after is None:
+                    continue
+                if all(buffer[p] in self._coverage(c) for p, c in zip(before, subtable.BacktrackCoverage)) and \
+                        all(buffer[p] in self._coverage(c) for p, c in zip(after, subtable.LookAheadCoverage)):
+                    buffer[i] = subtable.Substitute[coverage[buffer[i]]]
+                    break
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Shape strings with the GSUB table of a font.")
+    parser.add_argument("font", help="Font file (.ttf/.otf)")
+    parser.add_argument("text", nargs="*", help="Strings to shape")
+    parser.add_argument("--file", help="Report the shaping cost of every line of this file")
+    parser.add_argument("--features", nargs="+", default=["calt"])
+    args = parser.parse_args(argv)
+
+    shaper = Shaper(args.font, features=args.features)
+    report: Dict[str, Any] = {"results": [shaper.shape(text).to_json() for text in args.text]}
+    if args.file is not None:
+        with open(args.file, "r", encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f]
+        costs = shaper.shaping_cost(lines)
+        characters = max(sum(c["length"] for c in costs), 1)
+        report["file"] = {
+            "lines": len(costs),
+            "lookups_visited": sum(c["lookups_visited"] for c in costs),
+            "subtables_visited": sum(c["subtables_visited"] for c in costs),
+            "lookups_per_glyph": sum(c["lookups_visited"] for c in costs) / characters,
+            "subtables_per_glyph": sum(c["subtables_visited"] for c in costs) / characters
+        }
+    print(json.dumps(report, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
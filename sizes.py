@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Bytes that each definition group (one `add_macros`, `add_macro_font`, `add_ligatures`, ... call) adds to a generated font.
+
+    font.add_macro_font("vec", ..., group="vec")
+    font.save("Test", size_report="sizes.json")
+
+The new glyphs of a group are measured in the `glyf` or `CFF ` table of the generated file. The lookups are measured
+in its GSUB table, where they come first and in the order of the feature file of the build (see `merge_gsub`). The bytes
+of every lookup are split between the groups in proportion to the number of glyphs in their rules. Shared rules and
+glyphs, like the macro markers, belong to the group "shared".
+The lookups of the base font and the script and feature lists are not attributed to any group.
+
+Requires fontTools.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables.otBase import OTTableWriter
+
+# Group of the rules and glyphs that do not belong to a single definition
+SHARED = "shared"
+
+# Outline tables that are measured per glyph
+OUTLINE_TABLES = ("glyf", "CFF ")
+
+
+def glyph_sizes(tt: TTFont) -> Dict[str, int]:
+    """ Bytes of the outline of every glyph `{ GLYPH_NAME: BYTES }` in the `glyf` or `CFF ` table. """
+    if "glyf" in tt:
+        glyf = tt["glyf"]
+        return {name: len(glyf[name].compile(glyf)) for name in tt.getGlyphOrder()}
+    if "CFF " in tt:
+        char_strings = tt["CFF "].cff.topDictIndex[0].CharStrings
+        sizes = {}
+        for name in tt.getGlyphOrder():
+            char_string = char_strings[name]
+            char_string.compile()
+            sizes[name] = len(char_string.bytecode)
+        return sizes
+    return {}
+
+
+def lookup_sizes(tt: TTFont, lookup_names: List[str]) -> Dict[str, int]:
+    """
+    Bytes of every lookup `{ LOOKUP_NAME: BYTES }` in the GSUB table of `tt`. `lookup_names` are the names of the first
+    lookups of the table in their order. Like feaLib, lookups without rules are not part of the order.
+    """
+    if len(lookup_names) == 0:
+        return {}
+    lookups = tt["GSUB"].table.LookupList.Lookup if "GSUB" in tt else []
+    if len(lookups) < len(lookup_names):
+        raise Exception(f"The GSUB table has {len(lookups)} lookups, the feature file of the build {len(lookup_names)}")
+    sizes = OrderedDict()
+    for name, lookup in zip(lookup_names, lookups):
+        writer = OTTableWriter(tableTag="GSUB")
+        lookup.compile(writer, tt)
+        sizes[name] = len(writer.getAllData())
+    return sizes
+
+
+def group_sizes(font_file: str, features, glyph_groups: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """
+    Size report of the generated `font_file`:
+
+        {
+            "file": FONT_FILE,
+            "tables": { TAG: BYTES },
+            "groups": { GROUP: { "glyphs": GLYPHS, "glyf": BYTES, "GSUB": BYTES } }
+        }
+
+    `features` is the `_FeatureFile` of the build and `glyph_groups` the group of every new glyph.
+    """
+    tt = TTFont(font_file, lazy=True)
+    # The raw tables of the file, a font that is read from a file always has a reader
+    reader: Any = tt.reader
+    tables = OrderedDict((tag, len(reader[tag])) for tag in ("GSUB",) + OUTLINE_TABLES if tag in reader)
+    groups: Dict[str, Dict[str, int]] = OrderedDict()
+
+    def add(group: Optional[str], key: str, n: int):
+        sizes = groups.setdefault(SHARED if group is None else group, OrderedDict())
+        sizes[key] = sizes.get(key, 0) + n
+
+    outline_tag = next((tag for tag in OUTLINE_TABLES if tag in reader), None)
+    if outline_tag is not None:
+        sizes = glyph_sizes(tt)
+        # Glyphs that were pruned are not in the font
+        for glyph_name, group in glyph_groups.items():
+            if glyph_name in sizes:
+                add(group, "glyphs", 1)
+                add(group, outline_tag, sizes[glyph_name])
+
+    if len(features.group_weights) > 0:
+        lookup_names = [name for name, count in features.rule_counts().items() if count > 0]
+        for lookup_name, size in lookup_sizes(tt, lookup_names).items():
+            weights = features.group_weights.get(lookup_name, {})
+            total = sum(weights.values())
+            for group, weight in weights.items():
+                add(group, "GSUB", round(size * weight / total))
+    tt.close()
+    return {"file": font_file, "tables": tables, "groups": groups}
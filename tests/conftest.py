@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The modules of this repository are flat scripts next to this folder
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+INPUT_FOLDER = os.path.join(ROOT, "input_files")
+
+
+@pytest.fixture(scope="session")
+def input_folder() -> str:
+    return INPUT_FOLDER
+
+
+@pytest.fixture
+def open_font():
+    """ `open_font(FILE_NAME)` of the fontTools backend for the fonts in `input_files/`. Skips without fontTools. """
+    fonttools_backend = pytest.importorskip("fonttools_backend")
+    fonts = []
+
+    def open_input_font(file_name: str):
+        font = fonttools_backend.open_font(os.path.join(INPUT_FOLDER, file_name))
+        fonts.append(font)
+        return font
+
+    yield open_input_font
+    for font in fonts:
+        font.close()
@@ -0,0 +1,23 @@
+import pytest
+
+from ligaturize import codepoint_index, find_unicode_glyph
+
+
+class Glyph:
+    def __init__(self, unicode, altuni=None):
+        self.unicode = unicode
+        self.altuni = altuni
+
+
+def test_codepoint_index_prefers_primary_unicode():
+    font = {"A": Glyph(65), "Alt": Glyph(-1, ((65, -1, 0), (0x391, -1, 0))), "Alpha": Glyph(0x391)}
+    assert codepoint_index(font) == {65: "A", 0x391: "Alpha"}
+
+
+def test_find_unicode_glyph():
+    index = codepoint_index({"A": Glyph(65), "Alt": Glyph(-1, ((0x391, -1, 0),))})
+    assert find_unicode_glyph(index, "A") == "A"
+    assert find_unicode_glyph(index, "Α") == "Alt"
+    assert find_unicode_glyph(index, "B") is None
+    with pytest.raises(Exception):
+        find_unicode_glyph(index, "AB")
@@ -0,0 +1,25 @@
+from corpus import count_corpus, count_file, defined_counts, spec_macros
+
+
+def test_count_file(tmp_path):
+    tex_file = tmp_path / "a.tex"
+    tex_file.write_text("$\\alpha + \\mathbb N$\n$\\mathbb{N} \\subset \\mathbb{Z}$\n\\mathbbNo\n", encoding="utf-8")
+    counts, lines = count_file(str(tex_file))
+    assert lines == 3
+    # Both argument forms count as `mathbb{N}`, a longer word is no argument
+    assert counts == {"alpha": 1, "mathbb": 3, "mathbb{N}": 2, "mathbb{Z}": 1, "subset": 1, "mathbbNo": 1}
+
+
+def test_count_corpus_and_defined_counts(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.tex").write_text("\\alpha \\alpha\n", encoding="utf-8")
+    (tmp_path / "sub" / "b.tex").write_text("\\mathbb{R}\n", encoding="utf-8")
+    (tmp_path / "c.txt").write_text("\\alpha\n", encoding="utf-8")
+    result = count_corpus(str(tmp_path), jobs=1)
+    assert result == {"files": 2, "lines": 2, "counts": {"alpha": 2, "mathbb": 1, "mathbb{R}": 1}}
+
+    spec = {"steps": [{"add_macros": {"macros": {"alpha": "α", "beta": "β"}}},
+                      {"add_macro_font": {"macro": "mathbb", "map": {"R": "ℝ", "N": "ℕ"}}}]}
+    defined = defined_counts(result, spec_macros(spec))
+    assert defined["counts"] == {"alpha": 2, "mathbb": 1, "mathbb{R}": 1, "beta": 0, "mathbb{N}": 0}
+    assert defined["unused"] == ["beta", "mathbb{N}"]
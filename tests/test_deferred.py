@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("fontTools")
+
+from ligaturize import EditFont
+from shaping import Shaper
+
+
+@pytest.fixture(params=["fontforge", "fonttools"])
+def backend(request):
+    """ The name of the backend, the FontForge backend is skipped without FontForge. """
+    if request.param == "fontforge":
+        pytest.importorskip("fontforge")
+    return request.param
+
+
+def test_ligatures_before_macros(backend, tmp_path, input_folder):
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend=backend, deferred=True)
+    # The substitution lookups of the ligature are created before the macro length lookup
+    font.add_ligatures({"->": "→"}, fonts=["DejaVu_Bold"])
+    font.add_macros({"alpha": "α", "beta": "β"}, fonts=["DejaVu_Bold"])
+    output = font.save("Test")[0]
+    font.close()
+
+    shaper = Shaper(output.as_posix())
+    arrow = shaper.shape("->").glyphs
+    assert len(arrow) == 1 and arrow != ["hyphen"]
+    assert shaper.shape("\\alpha").glyphs == ["tex.DejaVuBold.alpha"]
+    assert shaper.shape("\\beta").glyphs == ["tex.DejaVuBold.beta"]
+    assert shaper.shape("\\gamma").glyphs[1:] == ["g", "a", "m", "m", "a"]
+    shaper.font.close()
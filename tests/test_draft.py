@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+from fontTools.ttLib import TTFont
+
+import build
+
+
+def test_draft_build(tmp_path, input_folder, capsys):
+    spec = {
+        "font": "DroidSansMono.ttf",
+        "other_fonts": {"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+        "options": {"backend": "fonttools"},
+        "steps": [{"add_macros": {"macros": {"alpha": "α"}, "fonts": ["DejaVu_Bold"]}}],
+        "save": {"camel_name": "Draft", "formats": ["ttf", "woff"]}
+    }
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(json.dumps(spec), encoding="utf-8")
+    out_folder = tmp_path / "out"
+    out_folder.mkdir()
+    arguments = [spec_file.as_posix(), "--in-folder", input_folder, "--out-folder", out_folder.as_posix()]
+
+    build.main(arguments + ["--draft"])
+    assert "Draft build: skipped Draft.woff" in capsys.readouterr().out
+    assert sorted(path.name for path in out_folder.iterdir()) == [build.CACHE_FILE, "Draft.ttf"]
+    draft = TTFont(out_folder / "Draft.ttf")
+    assert "fpgm" not in draft and "prep" not in draft
+    assert "tex.DejaVuBold.alpha" in draft.getGlyphOrder()
+    draft_hash = json.loads((out_folder / build.CACHE_FILE).read_text(encoding="utf-8"))["Draft.ttf"]
+
+    # The release build has another hash, the draft is not reused
+    build.main(arguments)
+    assert "Up to date" not in capsys.readouterr().out
+    assert sorted(path.name for path in out_folder.iterdir()) == [build.CACHE_FILE, "Draft.ttf", "Draft.woff"]
+    assert "fpgm" in TTFont(out_folder / "Draft.ttf")
+    assert json.loads((out_folder / build.CACHE_FILE).read_text(encoding="utf-8"))["Draft.ttf"] != draft_hash
+    build.main(arguments)
+    assert "Up to date" in capsys.readouterr().out
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from build import build_family
+
+
+@pytest.fixture
+def backend(open_font):
+    """ A fontTools backend of DroidSansMono with FiraCode as other font. """
+    from fonttools_backend import FontToolsBackend
+
+    return FontToolsBackend(open_font("DroidSansMono.ttf"), {"FiraCode": open_font("FiraCode-Regular.ttf")})
+
+
+def test_check_rule_set_of_font_without_glyphs(backend):
+    rule_set = {
+        "features": "",
+        "glyphs": [{"name": "arrow", "font": "FiraCode", "source": "arrowright"},
+                   {"name": "A", "font": "FiraCode", "source": "A"},
+                   {"name": "other", "font": "Unknown", "source": "other"}],
+        "markers": [],
+        "base_glyphs": ["backslash", "missing.glyph"],
+        "codepoints": {"92": "backslash", "945": "alpha.other", "8594": "arrowright"}
+    }
+    assert backend.check_rule_set(rule_set) == [
+        "Glyph `missing.glyph` is missing",
+        "U+03B1 is `alpha` instead of `alpha.other`",
+        "U+2192 is `None` instead of `arrowright`",
+        "Glyph `A` already exists",
+        "Unknown font `Unknown`"
+    ]
+
+
+def test_build_family_shapes_like_the_first_font(tmp_path, input_folder, capfd):
+    pytest.importorskip("fontTools")
+    from shaping import Shaper
+
+    spec = {
+        "font": "DroidSansMono.ttf",
+        "other_fonts": {"FiraCode": "FiraCode-Regular.ttf", "DejaVu_Italic": "DejaVuSansMono-Italic.ttf"},
+        "options": {"backend": "fonttools"},
+        "steps": [
+            {"add_macros": {"macros": {"alpha": "α", "beta": "β"}, "fonts": ["DejaVu_Italic"]}},
+            {"add_macros": {"macros": {"sum": "summation*FiraCode"}, "repl_prefix": "backslash", "repl_format": "advanced"}}
+        ],
+        "save": {"camel_name": "Family"}
+    }
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(json.dumps(spec), encoding="utf-8")
+    out_folder = tmp_path / "out"
+    out_folder.mkdir()
+
+    results = build_family(spec_file.as_posix(), ["DroidSansMono.ttf", "DejaVuSansMono-Bold.ttf"], jobs=1,
+                           in_folder=input_folder, out_folder=out_folder.as_posix())
+    assert [result.ok for result in results] == [True, True], [result.error for result in results]
+    # The second font only imported the glyphs of the rules of the first font
+    assert "the rules do not fit" not in capfd.readouterr().out
+
+    shapers = [Shaper(result.output) for result in results if result.output is not None]
+    for text in ["\\alpha", "\\beta", "\\sum", "\\gamma"]:
+        assert shapers[0].shape(text).glyphs == shapers[1].shape(text).glyphs
+    assert shapers[0].shape("\\alpha").glyphs == ["tex.DejaVuItalic.alpha"]
+    for shaper in shapers:
+        shaper.font.close()
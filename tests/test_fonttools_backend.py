@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("fontTools")
+hb = pytest.importorskip("uharfbuzz")
+
+from ligaturize import EditFont
+
+
+def hb_shape(path: str, text: str, features=None):
+    blob = hb.Blob.from_file_path(path)
+    font = hb.Font(hb.Face(blob))
+    buffer = hb.Buffer()
+    buffer.add_str(text)
+    buffer.guess_segment_properties()
+    hb.shape(font, buffer, {} if features is None else features)
+    return [font.glyph_to_string(info.codepoint) for info in buffer.glyph_infos]
+
+
+def test_lookups_of_base_font_still_apply(tmp_path, input_folder):
+    font = EditFont("FiraCode-Regular.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend="fonttools")
+    font.add_macros({"alpha": "α", "beta": "β"}, fonts=["DejaVu_Bold"])
+    output = font.save("FiraTest")[0].as_posix()
+    font.close()
+
+    base = os.path.join(input_folder, "FiraCode-Regular.ttf")
+    for text in ["->", "!=", "===", "www", "0xFF"]:
+        assert hb_shape(output, text) == hb_shape(base, text) != hb_shape(base, text, {"calt": False})
+    assert hb_shape(output, "\\alpha") == ["tex.DejaVuBold.alpha"]
+
+
+def test_one_feature_per_tag_and_language(tmp_path, input_folder):
+    from fontTools.ttLib import TTFont
+
+    font = EditFont("FiraCode-Regular.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend="fonttools")
+    font.add_macros({"alpha": "α"}, fonts=["DejaVu_Bold"])
+    output = font.save("FiraTest")[0].as_posix()
+    font.close()
+
+    gsub = TTFont(output)["GSUB"].table
+    tags = [record.FeatureTag for record in gsub.FeatureList.FeatureRecord]
+    assert tags == sorted(tags)
+    for script in gsub.ScriptList.ScriptRecord:
+        lang_systems = [script.Script.DefaultLangSys] + [record.LangSys for record in script.Script.LangSysRecord]
+        for lang_sys in lang_systems:
+            lang_tags = [tags[i] for i in lang_sys.FeatureIndex]
+            assert len(lang_tags) == len(set(lang_tags))
@@ -0,0 +1,22 @@
+import os
+import stat
+
+
+def test_written_entries_are_readable_by_others(tmp_path):
+    from ligaturize import _GlyphCache
+
+    font_file = tmp_path / "a.ttf"
+    font_file.write_bytes(b"font")
+    old_umask = os.umask(0o022)
+    try:
+        cache = _GlyphCache(str(tmp_path / "cache"), {"A": str(font_file)})
+        assert cache.get("A", "em", lambda: 1000) == 1000
+        cache.write()
+    finally:
+        os.umask(old_umask)
+
+    files = list((tmp_path / "cache").iterdir())
+    assert len(files) == 1 and files[0].suffix == ".json"
+    assert files[0].stat().st_mode & stat.S_IROTH
+    # A new cache reads the entry without computing it again
+    assert _GlyphCache(str(tmp_path / "cache"), {"A": str(font_file)}).get("A", "em", lambda: 0) == 1000
@@ -0,0 +1,38 @@
+from ligaturize import _EditorBackend
+
+
+def test_compatible_substitutions():
+    compatible = _EditorBackend._compatible_substitutions
+    assert compatible("gsub_single", {"a": "x"}, {"a": "x", "b": "y"})
+    assert not compatible("gsub_single", {"a": "x"}, {"a": "y"})
+    assert compatible("gsub_ligature", {("a", "b"): "x"}, {("c", "d"): "y"})
+    # A longer ligature with the same first glyph could match instead
+    assert not compatible("gsub_ligature", {("a", "b"): "x"}, {("a", "b", "c"): "y"})
+
+
+def test_ligatures_interact():
+    interact = _EditorBackend.ligatures_interact
+    # The inputs overlap at another start position
+    assert interact((["a", "b"], ["x"]), (["b", "c"], ["y"]))
+    # One outputs a glyph the other matches
+    assert interact((["a", "b"], ["x"]), (["x", "c"], ["y"]))
+    # Only the same first glyph
+    assert not interact((["a", "b"], ["x"]), (["a", "c"], ["y"]))
+    assert not interact((["a", "b"], ["x"]), (["c", "d"], ["y"]))
+
+
+def test_pack_ligatures():
+    a = (["a", "b"], ["x"])
+    b = (["c", "d"], ["y"])
+    c = (["b", "e"], ["z"])
+    d = (["f", "g"], ["w"])
+    # `c` overlaps with `a` and starts a new lookup, which the independent `d` joins
+    assert _EditorBackend.pack_ligatures([a, b, c, d]) == [[a, b], [c, d]]
+    assert _EditorBackend.pack_ligatures([]) == []
+
+
+def test_order_by_first_glyph():
+    rules = [({"a"}, 1), ({"b"}, 2), ({"a"}, 3), ({"c", "b"}, 4)]
+    assert _EditorBackend.order_by_first_glyph(rules) == [1, 3, 2, 4]
+    # The group with the highest total weight comes first, the order inside a group is kept
+    assert _EditorBackend.order_by_first_glyph(rules, [0, 1, 0, 5]) == [2, 4, 1, 3]
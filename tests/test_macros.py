@@ -0,0 +1,91 @@
+from typing import Any, List, Tuple
+
+import pytest
+
+
+@pytest.fixture
+def backend(open_font):
+    """ A fontTools backend whose macro rules are recorded in `added` instead of added to the font. """
+    from fonttools_backend import FontToolsBackend
+
+    class RecordingBackend(FontToolsBackend):
+        added: List[Tuple[Any, ...]]
+
+        def add_advanced_ligature(self, char_in, char_out, **lookup):
+            self.added.append(("ligature", list(char_in), list(char_out)))
+
+        def add_class_ligature(self, char_in, arg_index, args, **lookup):
+            self.added.append(("class", list(char_in), arg_index, dict(args)))
+
+    backend = RecordingBackend(open_font("DroidSansMono.ttf"), {})
+    backend.added = []
+    return backend
+
+
+def test_siblings_become_one_class_rule(backend):
+    backend.compile_macros([
+        (["m3", "s", "u", "b"], ["subset"]),
+        (["m3", "s", "u", "m"], ["summation"])
+    ])
+    assert backend.added == [("class", ["m3", "s", "u", None], 3, {"b": ["subset"], "m": ["summation"]})]
+
+
+def test_prefix_of_another_macro_is_not_merged(backend):
+    backend.compile_macros([
+        (["m3", "i", "n"], ["element"]),
+        (["m3", "i", "n", "t"], ["integral"]),
+        (["m3", "i", "s"], ["is"])
+    ])
+    assert all(rule[0] == "ligature" for rule in backend.added)
+    assert sorted(rule[2] for rule in backend.added) == [["element"], ["integral"], ["is"]]
+
+
+def test_latest_definition_wins(backend):
+    backend.compile_macros([
+        (["m2", "i", "n"], ["old"]),
+        (["m2", "i", "n"], ["new"])
+    ])
+    assert backend.added == [("ligature", ["m2", "i", "n"], ["new"])]
+
+
+def test_arguments_are_merged_around_the_suffix(backend):
+    backend.compile_macros([
+        (["m2", "b", "b", "{", "N", "}"], ["N.bb"]),
+        (["m2", "b", "b", "{", "Z", "}"], ["Z.bb"])
+    ])
+    assert backend.added == [("class", ["m2", "b", "b", "{", None, "}"], 4, {"N": ["N.bb"], "Z": ["Z.bb"]})]
+
+
+@pytest.mark.parametrize("arguments", [{"N": "ℕ", "Z": "ℤ"}, {"N": "ℕ", "Z": "ℤ", "R": "ℝ", "Q": "ℚ"}])
+def test_argument_macro_rules_do_not_grow_with_arguments(input_folder, arguments):
+    pytest.importorskip("fontTools")
+    from ligaturize import EditFont
+
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, backend="fonttools")
+    font.add_macro_font("mathbb", arguments, fonts=["DejaVu_Bold"])
+    font.backend.compile()
+    # One class based rule for each of `\mathbb N`, `\mathbb<NBSP>N` and `\mathbb{N}`
+    assert font.backend.features.rule_counts()[font.backend.macro_trie_lookup] == 3
+    font.close()
+
+
+def test_argument_macros_shape(tmp_path, input_folder):
+    pytest.importorskip("fontTools")
+    from ligaturize import EditFont
+    from shaping import Shaper
+
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend="fonttools")
+    font.add_macro_font("mathbb", {"N": "ℕ", "Z": "ℤ", "R": "ℝ"}, fonts=["DejaVu_Bold"])
+    output = font.save("Test")[0].as_posix()
+    font.close()
+
+    shaper = Shaper(output)
+    for text in ("\\mathbb{N}", "\\mathbb N", "\\mathbb\u00a0N"):
+        assert shaper.shape(text).glyphs == ["tex.DejaVuBold.uni2115"]
+    assert shaper.shape("\\mathbb{R}x").glyphs == ["tex.DejaVuBold.uni211D", "x"]
+    # An argument without a replacement and a longer macro keep their letters
+    for text in ("\\mathbb{Q}", "\\mathbb Q", "\\mathbbN"):
+        assert shaper.shape(text).glyphs[1:] == shaper.glyphs_for_text(text)[1:]
+    shaper.font.close()
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+import build
+from ligaturize import EditFont
+
+
+def test_macro_conflicts_are_reported_once(input_folder):
+    font = EditFont("DroidSansMono.ttf", other_fonts={"FiraCode": "FiraCode-Regular.ttf"},
+                    in_folder=input_folder, backend="plan")
+    font.add_macro_font("bb", {"N": "→"})
+    font.add_macros({"bb": "⇒"})
+    font.add_macros({"bbN": "⇐"})
+    font.add_macros({"bbN": "⇔"})
+    conflicts = font.plan()["macro_conflicts"]
+    font.close()
+
+    # `\bb N` with a space and with a no-break space is one macro
+    assert conflicts == [
+        {"macro": "\\bbN", "conflict": "redefined"},
+        {"macro": "\\bb", "conflict": "prefix of \\bb N"},
+        {"macro": "\\bb", "conflict": "prefix of \\bb{N}"}
+    ]
+
+
+def test_plan_fails_on_missing_glyphs(tmp_path, input_folder, capsys):
+    spec = {
+        "font": "DroidSansMono.ttf",
+        "other_fonts": {"FiraCode": "FiraCode-Regular.ttf"},
+        "steps": [{"add_macros": {"macros": {"sum": "summation*FiraCod", "prod": "produc*FiraCode"},
+                                  "repl_prefix": "backslash", "repl_format": "advanced"}}],
+        "save": {"camel_name": "Plan"}
+    }
+    spec_file = tmp_path / "spec.json"
+    spec_file.write_text(json.dumps(spec), encoding="utf-8")
+
+    with pytest.raises(SystemExit) as exit_info:
+        build.main([spec_file.as_posix(), "--plan", "--in-folder", input_folder])
+    assert exit_info.value.code == 1
+    output = capsys.readouterr()
+    missing = json.loads(output.out)["missing"]
+    assert [(entry["glyph"], entry["fonts"]) for entry in missing] == [("summation", ["FiraCod"]), ("produc", ["FiraCode"])]
+    assert "Unknown font `FiraCod`" in missing[0]["error"]
+    errors = [line for line in output.err.splitlines() if line.startswith("Missing: ")]
+    assert len(errors) == 2 and "produc" in errors[1]
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("fontTools")
+hb = pytest.importorskip("uharfbuzz")
+
+from fontTools.ttLib import TTFont
+
+from ligaturize import EditFont
+
+
+def save_font(input_folder: str, out_folder: str, **save):
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=out_folder, backend="fonttools")
+    font.add_macros({"alpha": "α", "beta": "β"}, fonts=["DejaVu_Bold"])
+    outputs = font.save("Pruned", **save)
+    font.close()
+    return outputs
+
+
+def hb_shape(path: str, text: str):
+    font = hb.Font(hb.Face(hb.Blob.from_file_path(path)))
+    buffer = hb.Buffer()
+    buffer.add_str(text)
+    buffer.guess_segment_properties()
+    hb.shape(font, buffer, {})
+    return [font.glyph_to_string(info.codepoint) for info in buffer.glyph_infos]
+
+
+def test_prune_keeps_special_and_reachable_glyphs(tmp_path, input_folder):
+    (tmp_path / "full").mkdir()
+    full = TTFont(save_font(input_folder, (tmp_path / "full").as_posix())[0])
+    outputs = save_font(input_folder, tmp_path.as_posix(), prune=True, formats=["ttf", "woff"])
+    assert [output.name for output in outputs] == ["Pruned.ttf", "Pruned.woff"]
+
+    pruned = TTFont(outputs[0])
+    glyphs = pruned.getGlyphOrder()
+    assert glyphs[:3] == [".notdef", ".null", "nonmarkingreturn"]
+    assert len(glyphs) < len(full.getGlyphOrder())
+    assert set(glyphs) <= set(full.getGlyphOrder())
+    assert {"tex.DejaVuBold.alpha", "tex.DejaVuBold.beta"} <= set(glyphs)
+    assert pruned.getBestCmap() == full.getBestCmap()
+    assert hb_shape(outputs[0].as_posix(), "\\alpha+\\beta") == ["tex.DejaVuBold.alpha", "plus", "tex.DejaVuBold.beta"]
+
+    # HarfBuzz does not read WOFF, it has the same tables as the TrueType file
+    woff = TTFont(outputs[1])
+    assert woff.flavor == "woff"
+    for tag in ("cmap", "glyf", "GSUB"):
+        assert woff.getTableData(tag) == pruned.getTableData(tag)
+
+
+def test_woff2(tmp_path, input_folder):
+    pytest.importorskip("brotli")
+    output = save_font(input_folder, tmp_path.as_posix(), prune=True, formats=["woff2"])[0]
+    tt = TTFont(output)
+    assert tt.flavor == "woff2"
+    assert tt.getGlyphOrder()[:3] == [".notdef", ".null", "nonmarkingreturn"]
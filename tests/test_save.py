@@ -0,0 +1,53 @@
+import pytest
+
+from ligaturize import EditFont, generate_atomic
+
+
+class FailingFont:
+    """ A font whose `generate` writes part of the file and fails. """
+
+    def generate(self, file_name: str):
+        with open(file_name, "wb") as f:
+            f.write(b"partial")
+        raise Exception("generate failed")
+
+
+def test_failed_generate_keeps_the_old_file(tmp_path):
+    output = tmp_path / "Test.ttf"
+    output.write_bytes(b"old")
+    with pytest.raises(Exception, match="generate failed"):
+        generate_atomic(FailingFont(), output)
+    assert output.read_bytes() == b"old"
+    # The temporary folder is removed
+    assert list(tmp_path.iterdir()) == [output]
+
+
+def test_save_several_formats(tmp_path, input_folder):
+    pytest.importorskip("fontTools")
+    from fontTools.ttLib import TTFont
+
+    (tmp_path / "Test.ttf").write_bytes(b"old")
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend="fonttools")
+    font.add_macros({"alpha": "α"}, fonts=["DejaVu_Bold"])
+    outputs = font.save("Test", formats=["ttf", "woff"])
+    font.close()
+
+    assert outputs == [tmp_path / "Test.ttf", tmp_path / "Test.woff"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["Test.ttf", "Test.woff"]
+    for output in outputs:
+        assert "tex.DejaVuBold.alpha" in TTFont(output).getGlyphOrder()
+
+
+def test_save_formats_in_worker_processes(tmp_path, input_folder):
+    pytest.importorskip("fontforge")
+
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix())
+    font.add_macros({"alpha": "α"}, fonts=["DejaVu_Bold"])
+    outputs = font.save("Test", formats=["ttf", "otf", "woff"], jobs=2)
+    font.close()
+
+    assert outputs == [tmp_path / name for name in ("Test.ttf", "Test.otf", "Test.woff")]
+    # The saved project of the workers is removed
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["Test.otf", "Test.ttf", "Test.woff"]
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("fontTools")
+hb = pytest.importorskip("uharfbuzz")
+
+from ligaturize import EditFont
+from shaping import Shaper
+
+SUPERSCRIPTS = {"1": "¹", "2": "²", "a": "ᵃ"}
+SUBSCRIPTS = {"1": "₁", "2": "₂", "a": "ₐ", "e": "ₑ"}
+
+
+@pytest.fixture(scope="module", params=["fontforge", "fonttools"])
+def output(request, tmp_path_factory, input_folder):
+    """ A font with superscripts and subscripts, built in deferred mode. FontForge is skipped if it is missing. """
+    if request.param == "fontforge":
+        pytest.importorskip("fontforge")
+    out_folder = tmp_path_factory.mktemp("fonts")
+    font = EditFont("DroidSansMono.ttf",
+                    other_fonts={"FiraCode": "FiraCode-Regular.ttf", "DejaVu_Italic": "DejaVuSansMono-Italic.ttf"},
+                    in_folder=input_folder, out_folder=out_folder.as_posix(), backend=request.param, deferred=True)
+    font.add_macros({"alpha": "α"}, fonts=["DejaVu_Italic"])
+    # Like in ligatures.json the scripts are added before the deferred macros are compiled
+    font.add_scripts("^", SUPERSCRIPTS, unbraced="12", fonts=["FiraCode", "DejaVu_Italic"])
+    font.add_scripts("_", SUBSCRIPTS, unbraced="12", fonts=["FiraCode", "DejaVu_Italic"])
+    path = font.save("Scripts")[0].as_posix()
+    font.close()
+    return path
+
+
+def hb_shape(path: str, text: str):
+    font = hb.Font(hb.Face(hb.Blob.from_file_path(path)))
+    buffer = hb.Buffer()
+    buffer.add_str(text)
+    buffer.guess_segment_properties()
+    hb.shape(font, buffer, {})
+    return [font.glyph_to_string(info.codepoint) for info in buffer.glyph_infos]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("x^{12}", ["x", "tex.FiraCode.uni00B9", "tex.FiraCode.uni00B2"]),
+    ("x^12", ["x", "tex.FiraCode.uni00B9", "tex.FiraCode.uni00B2"]),
+    ("x^{a}", ["x", "tex.DejaVuItalic.uni1D43"]),
+    ("x_{ae}", ["x", "tex.DejaVuItalic.uni2090", "tex.DejaVuItalic.uni2091"]),
+    ("a_1b", ["a", "tex.FiraCode.uni2081", "b"]),
+    # Not closed, an unknown argument and a letter without braces stay as they are
+    ("x^{1", ["x", "asciicircum", "braceleft", "one"]),
+    ("x^{1c}", ["x", "asciicircum", "braceleft", "one", "c", "braceright"]),
+    ("x^c", ["x", "asciicircum", "c"]),
+    ("snake_a", ["s", "n", "a", "k", "e", "underscore", "a"]),
+    ("\\alpha^2", ["tex.DejaVuItalic.alpha", "tex.FiraCode.uni00B2"])
+])
+def test_scripts(output, text, expected):
+    shaper = Shaper(output)
+    assert shaper.shape(text).glyphs == expected
+    assert hb_shape(output, text) == expected
+    shaper.font.close()
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+from ligaturize import EditFont
+from shaping import Shaper
+
+
+@pytest.fixture(scope="module", params=[("fonttools", True), ("fontforge", False), ("fontforge", True)],
+                ids=["fonttools", "fontforge-immediate", "fontforge-deferred"])
+def shaper(request, tmp_path_factory, input_folder):
+    """ A font with macros that share prefixes. The fontTools backend is always deferred, FontForge is skipped if it is missing. """
+    backend, deferred = request.param
+    if backend == "fontforge":
+        pytest.importorskip("fontforge")
+    out_folder = tmp_path_factory.mktemp("fonts")
+    font = EditFont("DroidSansMono.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=out_folder.as_posix(), backend=backend, deferred=deferred)
+    font.add_macros({"alpha": "α", "beta": "β", "in": "∈", "int": "∫", "sub": "⊂", "sum": "∑"})
+    font.add_macros({"balpha": "α", "bbeta": "β"}, fonts=["DejaVu_Bold"])
+    output = font.save("Test")[0]
+    font.close()
+    shaper = Shaper(output.as_posix())
+    yield shaper
+    shaper.font.close()
+
+
+def shape(shaper: Shaper, text: str):
+    return shaper.shape(text).glyphs
+
+
+@pytest.mark.parametrize("text, macro", [
+    ("\\beta ", "\\balpha "),
+    ("\\in ", "\\int "),
+    ("\\sub ", "\\sum "),
+])
+def test_macros_with_shared_prefix(shaper, text, macro):
+    """ Macros that share a prefix each get their own replacement, whatever the order of the rules. """
+    assert shape(shaper, text) != shape(shaper, macro)
+    assert len(shape(shaper, text)) == 2
+    assert len(shape(shaper, macro)) == 2
+
+
+def test_macro_replacements(shaper):
+    alpha = shaper.cmap[ord("α")]
+    beta = shaper.cmap[ord("β")]
+    space = shaper.cmap[ord(" ")]
+    assert shape(shaper, "\\alpha ") == [alpha, space]
+    assert shape(shaper, "\\beta ") == [beta, space]
+    # The bold glyphs are imported from the bold font
+    assert shape(shaper, "\\balpha ") == ["tex.DejaVuBold.alpha", space]
+    assert shape(shaper, "\\bbeta ") == ["tex.DejaVuBold.beta", space]
+
+
+def test_longer_and_unknown_macros_stay(shaper):
+    """ A macro is only replaced if it is followed by a non-letter. The backslash may become a marker glyph that looks the same. """
+    for text in ("\\alphax", "\\integral", "\\bet "):
+        glyphs = shape(shaper, text)
+        assert glyphs[0] == "backslash" or glyphs[0].startswith("macro.")
+        assert glyphs[1:] == shaper.glyphs_for_text(text)[1:]
+
+
+def test_only_first_feature_of_a_tag(tmp_path, input_folder):
+    """ A second `calt` feature of a language system is ignored, as by HarfBuzz. """
+    hb = pytest.importorskip("uharfbuzz")
+    from fontTools.ttLib import TTFont
+    from fonttools_backend import otTables
+
+    tt = TTFont(os.path.join(input_folder, "FiraCode-Regular.ttf"))
+    gsub = tt["GSUB"].table
+    empty = otTables.FeatureRecord()
+    empty.FeatureTag = "calt"
+    empty.Feature = otTables.Feature()
+    empty.Feature.FeatureParams = None
+    empty.Feature.LookupListIndex = []
+    empty.Feature.LookupCount = 0
+    gsub.FeatureList.FeatureRecord.append(empty)
+    gsub.FeatureList.FeatureCount += 1
+    for script in gsub.ScriptList.ScriptRecord:
+        for lang_sys in [script.Script.DefaultLangSys] + [record.LangSys for record in script.Script.LangSysRecord]:
+            if lang_sys is not None:
+                lang_sys.FeatureIndex.insert(0, gsub.FeatureList.FeatureCount - 1)
+                lang_sys.FeatureCount += 1
+    path = (tmp_path / "FiraCodeTwoCalt.ttf").as_posix()
+    tt.save(path)
+
+    font = hb.Font(hb.Face(hb.Blob.from_file_path(path)))
+    shaper = Shaper(path)
+    for text in ["->", "!=", "www"]:
+        buffer = hb.Buffer()
+        buffer.add_str(text)
+        buffer.guess_segment_properties()
+        hb.shape(font, buffer, {})
+        assert shape(shaper, text) == [font.glyph_to_string(info.codepoint) for info in buffer.glyph_infos]
+        assert shape(shaper, text) == shaper.glyphs_for_text(text)
+    shaper.font.close()
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+pytest.importorskip("fontTools")
+
+from fontTools.ttLib import TTFont
+
+from ligaturize import EditFont
+from sizes import SHARED, glyph_sizes, lookup_sizes
+
+
+def test_size_report_matches_the_generated_font(tmp_path, input_folder):
+    font = EditFont("FiraCode-Regular.ttf", other_fonts={"DejaVu_Bold": "DejaVuSansMono-Bold.ttf"},
+                    in_folder=input_folder, out_folder=tmp_path.as_posix(), backend="fonttools")
+    font.add_macros({"alpha": "α", "beta": "β", "gamma": "γ"}, fonts=["DejaVu_Bold"], group="greek")
+    font.add_macro_font("mathbb", {"N": "ℕ", "Z": "ℤ"}, fonts=["DejaVu_Bold"], group="mathbb")
+    report_file = tmp_path / "sizes.json"
+    output = font.save("Sizes", size_report=report_file.as_posix())[0]
+    lookup_names = [name for name, count in font.backend.features.rule_counts().items() if count > 0]
+    new_glyphs = list(font.backend.glyph_groups)
+    font.close()
+
+    with open(report_file, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    tt = TTFont(output)
+    assert report["tables"] == {tag: len(tt.getTableData(tag)) for tag in ("GSUB", "glyf")}
+    groups = report["groups"]
+    assert set(groups) == {"greek", "mathbb", SHARED}
+    assert groups["greek"]["glyphs"] == 3 and groups["mathbb"]["glyphs"] == 2
+
+    # The glyph sizes add up exactly, the lookup sizes up to rounding
+    sizes = glyph_sizes(tt)
+    assert sum(group.get("glyf", 0) for group in groups.values()) == sum(sizes[name] for name in new_glyphs)
+    gsub_total = sum(lookup_sizes(tt, lookup_names).values())
+    assert abs(sum(group.get("GSUB", 0) for group in groups.values()) - gsub_total) <= len(lookup_names) * len(groups)
+    # The lookups of the base font are not attributed
+    assert gsub_total < report["tables"]["GSUB"]
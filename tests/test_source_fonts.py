@@ -0,0 +1,35 @@
+def test_release_keeps_open_fonts_of_plain_dict(open_font):
+    from fonttools_backend import FontToolsBackend
+
+    fira = open_font("FiraCode-Regular.ttf")
+    backend = FontToolsBackend(open_font("DroidSansMono.ttf"), {"FiraCode": fira})
+    glyph_name = backend.use_glyph("→", fonts=["FiraCode"])
+    backend.release_source_fonts()
+
+    assert glyph_name in backend.font
+    # The font belongs to the caller and is still usable
+    assert backend.source_fonts["FiraCode"] is fira
+    assert not fira.tt.reader.file.closed
+
+
+def test_closed_font_is_opened_again():
+    from ligaturize import _SourceFonts
+
+    class Font:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    opened = []
+
+    def open_font(path):
+        opened.append(path)
+        return Font()
+
+    fonts = _SourceFonts({"A": "a.ttf"}, open_font=open_font)
+    first = fonts["A"]
+    fonts.close("A")
+    assert first.closed
+    assert fonts["A"] is not first
+    assert opened == ["a.ttf", "a.ttf"]